@@ -48,12 +48,12 @@ import PySide6.QtWidgets
 import PySide6.QtGui
 import PySide6.QtMultimedia
 
-@dataclasses.dataclass
+@dataclasses.dataclass( slots=True )
 class _FrameInfo:
     image : numpy.ndarray
     cam_id : int
 
-@dataclasses.dataclass
+@dataclasses.dataclass( slots=True )
 class _ImageDetectionsInfo:
     frame_info : _FrameInfo
     detections : list[SvDetection]
@@ -63,7 +63,7 @@ class _SurveillanceWindowSignals(PySide6.QtCore.QObject):
     frame = PySide6.QtCore.Signal( _FrameInfo )
     detection = PySide6.QtCore.Signal( _ImageDetectionsInfo )
 
-@dataclasses.dataclass
+@dataclasses.dataclass( slots=True )
 class _AudioChunk:
     chunk : bytes
     cam_id : int
@@ -140,6 +140,9 @@ class _Detector():
                     'rtsp_transport': 'tcp' if self._configuration.use_tcp_transport else 'udp',
                     'stimeout' : str(self._configuration.camera_feed_timeout.total_seconds()*pow(10,6)),
                     'max_delay': str(self._configuration.max_delay.total_seconds()*pow(10,6)),
+                    # hand packets over as soon as they arrive, only the latest frame is of interest
+                    'fflags': 'nobuffer',
+                    'flags': 'low_delay',
                 },
             )
             if cam_definition.discard_corrupted_frames:
@@ -164,22 +167,36 @@ class _Detector():
         default_coco_class_ids = [interest.coco_class_id for interest in default_interests]
         self._configuration.detection_logic.configure( default_coco_class_ids, self._configuration.initial_confidence )
 
+        detection_logic = self._configuration.detection_logic
+        detect_batch = getattr( detection_logic, "detect_batch", None ) # optional, the protocol need not be subclassed
+
         while True:
+            if self._shutdown_pending:
+                return
+            
+            try:
+                values = self._model_update_queue.get_nowait()
+                detection_logic.configure( *values )
+            except queue.Empty:
+                pass
+            
+            # one detection call per round over the cams so that the detection logic can batch the frames
+            cam_frames : list[tuple[CamDefinition,numpy.ndarray]] = []
             for cam_definition, last_frame_capture in zip( self._configuration.cam_definitions, self._last_frame_captures ):
-                if self._shutdown_pending:
-                    return
-                
-                try:
-                    values = self._model_update_queue.get_nowait()
-                    self._configuration.detection_logic.configure( *values )
-                except queue.Empty:
-                    pass
-                
                 frame = last_frame_capture.get_latest_frame(timeout=0.01)
-                if frame is None:
-                    continue
-                
-                detections = self._filter_ignored( self._configuration.detection_logic.detect( frame ), cam_definition, Point2D(frame.shape[1], frame.shape[0]) )
+                if frame is not None:
+                    cam_frames.append( (cam_definition, frame) )
+            
+            if len( cam_frames ) == 0:
+                continue
+            
+            if detect_batch is not None:
+                frame_detections = detect_batch( [frame for _, frame in cam_frames] )
+            else:
+                frame_detections = [detection_logic.detect( frame ) for _, frame in cam_frames]
+            
+            for (cam_definition, frame), detections in zip( cam_frames, frame_detections ):
+                detections = self._filter_ignored( detections, cam_definition, Point2D(frame.shape[1], frame.shape[0]) )
                 
                 if len(detections) > 0:
                     annotated_frame = annotator.annotate(scene=frame.copy(), detections=detections)
@@ -612,7 +629,7 @@ class SurveillanceWidget(PySide6.QtWidgets.QWidget):
 
         timer = PySide6.QtCore.QTimer(self)
         timer.timeout.connect( self._update_live_view_connection_status )
-        timer.start(10)
+        timer.start(30) # fast enough to show every opacity step of the blinking disconnection overlay
 
     def _get_initial_pixmap( self, file_path : str, index : int ) -> PySide6.QtGui.QPixmap:
         "Get initial pixmap adjusted so that it fits the widget - the icon is the same size on each cam."
@@ -660,6 +677,8 @@ class SurveillanceWidget(PySide6.QtWidgets.QWidget):
         return wrapped_handler
     
     def shutdown( self ) -> None:
+        self._ignore_list.shut_down() # owns a timer so it has to be done on this thread
+
         shutdown_actions = (
             [self._alert_player.shut_down, self._detector.shut_down] 
             +
@@ -4,7 +4,7 @@ import numpy
 import typing
 import supervision
 
-@dataclasses.dataclass
+@dataclasses.dataclass( slots=True )
 class SvDetection:
     """Helper to access SV detection properties"""
     xyxy_coords : list[numpy.float32]
@@ -18,7 +18,7 @@ class SvDetection:
     def from_sv_detection( supervision_detection_values : list ) -> "SvDetection":
         xyxy_coords, mask, confidence, coco_class_id, tracker_id, data = supervision_detection_values
         return SvDetection(
-            xyxy_coords=[float(value) for value in xyxy_coords],
+            xyxy_coords=xyxy_coords.tolist() if isinstance( xyxy_coords, numpy.ndarray ) else [float(value) for value in xyxy_coords],
             mask=mask,
             confidence=float(confidence),
             coco_class_id=int(coco_class_id),
@@ -28,23 +28,40 @@ class SvDetection:
     
     @staticmethod
     def list_from_sv_detections( detections : supervision.Detections ) -> list["SvDetection"]:
-        return [SvDetection.from_sv_detection(detection) for detection in detections]
+        # convert whole columns at once, tolist() yields the same Python floats and ints as the per-item casts
+        count = len(detections)
+        xyxy_coords = detections.xyxy.tolist()
+        confidences = detections.confidence.tolist()
+        coco_class_ids = detections.class_id.tolist()
+        tracker_ids = [None]*count if detections.tracker_id is None else detections.tracker_id.tolist()
+        masks = [None]*count if detections.mask is None else detections.mask
+        return [
+            SvDetection(
+                xyxy_coords=xyxy_coords[i],
+                mask=masks[i],
+                confidence=confidences[i],
+                coco_class_id=coco_class_ids[i],
+                tracker_id=tracker_ids[i],
+                data={ key : value[i] for key, value in detections.data.items() }
+            )
+            for i in range(count)
+        ]
 
 _T = typing.TypeVar('T')
 
-@dataclasses.dataclass
+@dataclasses.dataclass( slots=True )
 class Point2D(typing.Generic[_T]):
     x : _T
     y : _T
 
-@dataclasses.dataclass
+@dataclasses.dataclass( slots=True )
 class ObjectDetectionInfo:
     cam_id : int
     supervision : SvDetection
     when : datetime.datetime
     frame_size : Point2D[int]
 
-@dataclasses.dataclass
+@dataclasses.dataclass( slots=True )
 class IgnorePoint:
     coco_class_id : int
     at : Point2D[float] # 0.0-1.1 values
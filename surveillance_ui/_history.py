@@ -4,6 +4,7 @@ import pathlib
 import datetime
 import numpy
 import re
+import struct
 import pathlib
 from .interface import (
     Configuration,
@@ -19,8 +20,14 @@ from .utility import (
 import PIL.Image
 import PIL.ImageQt
 
+# SOF0-SOF15 except DHT (0xc4), JPG (0xc8) and DAC (0xcc)
+_JPEG_START_OF_FRAME_MARKERS = frozenset( range( 0xc0, 0xd0 ) ) - { 0xc4, 0xc8, 0xcc }
+
 class DetectionHistory:
     _FOLDER = pathlib.Path("detections/")
+    _FILENAME_PATTERN = re.compile(
+        r"(?P<datetime>\d+-\d+-\d+ \d+-\d+-\d+) coco(?P<coco_class_id>\d+) cam(?P<cam_id>\d+) rect(?P<rectangle_x1>\d+)-(?P<rectangle_y1>\d+)-(?P<rectangle_x2>\d+)-(?P<rectangle_y2>\d+)(?: frame(?P<frame_x>\d+)-(?P<frame_y>\d+))? conf(?P<conf>\d+).jpg"
+    )
 
     _configuration : Configuration
 
@@ -52,12 +59,16 @@ class DetectionHistory:
         return True
 
     def is_fresh_detection(self, detection : ObjectDetectionInfo) -> bool:
-        for existing_detection in self._detection_list:
-            if ( detection.cam_id == existing_detection.cam_id
+        # compare against one precomputed bound instead of adding the delay to every entry
+        stale_after = detection.when - self._configuration.redetection_delay
+        cam_id = detection.cam_id
+        coco_class_id = detection.supervision.coco_class_id
+        for existing_detection in reversed( self._detection_list ): # newest first, they are the likeliest to match
+            if ( existing_detection.cam_id == cam_id
                  and
-                 detection.supervision.coco_class_id == existing_detection.supervision.coco_class_id
+                 existing_detection.supervision.coco_class_id == coco_class_id
                  and
-                 detection.when <= existing_detection.when + self._configuration.redetection_delay ):
+                 stale_after <= existing_detection.when ):
                 return False
         return True
     
@@ -65,11 +76,18 @@ class DetectionHistory:
         return self._detection_list.copy()
 
     def _control_length(self):
-        while len(self._detection_list) > self._configuration.max_history_entries:
-            detection = self._detection_list.pop(0)
+        excess_count = len(self._detection_list) - self._configuration.max_history_entries
+        if excess_count <= 0:
+            return
+
+        removed_detections = self._detection_list[:excess_count]
+        del self._detection_list[:excess_count]
+
+        # the list is consistent at this point so listeners can update right away, the files can go afterwards
+        for detection in removed_detections:
             self.removed_dispatcher.fire(detection)
-            path = self._FOLDER / self._detection_info_to_filename( detection )
-            path.unlink()
+        for detection in removed_detections:
+            os.unlink( self._FOLDER / self._detection_info_to_filename( detection ) )
 
     def get_detection_image_data(self, detection : ObjectDetectionInfo ) -> numpy.ndarray:
         filename = self._detection_info_to_filename( detection )
@@ -78,18 +96,35 @@ class DetectionHistory:
 
     def _load_saved_detections(self) -> None:
         detections : list[ObjectDetectionInfo] = []
+        legacy_detections : list[tuple[str, ObjectDetectionInfo]] = []
         try:
-            for filename in os.listdir(self._FOLDER):
-                path = self._FOLDER / filename
-                if not os.path.isfile(path):
-                    continue
-                detection = self.detection_info_from_file( filename )
-                if detection is None:
-                    continue
-
-                detections.append( detection )
+            # scandir reports the entry type from the directory listing itself, so there is no extra stat per file
+            with os.scandir(self._FOLDER) as entries:
+                for entry in entries:
+                    if not entry.is_file():
+                        continue
+                    detection = self.detection_info_from_file( entry.name )
+                    if detection is None:
+                        continue
+
+                    if self._FILENAME_PATTERN.fullmatch( entry.name ).group("frame_x") is None:
+                        legacy_detections.append( ( entry.path, detection ) )
+                    else:
+                        detections.append( detection )
         except FileNotFoundError:
             pass # the folder does not exist yet so continue with no saved detections
+
+        # older files lack the frame size token, rename them so that every lookup can rebuild the name
+        # done after the listing is closed, renaming while scandir iterates could list a file twice
+        for path, detection in legacy_detections:
+            new_path = self._FOLDER / self._detection_info_to_filename( detection )
+            if new_path.exists():
+                continue # an entry with the same name is loaded already, os.rename would silently replace it
+            try:
+                os.rename( path, new_path )
+            except OSError:
+                continue
+            detections.append( detection )
         
         detections.sort( key = lambda x: x.when )
 
@@ -98,10 +133,7 @@ class DetectionHistory:
         self._control_length()            
 
     def detection_info_from_file( self, filename : str  ) -> "ObjectDetectionInfo | None":
-        match : re.Match = re.fullmatch(
-            r"(?P<datetime>\d+-\d+-\d+ \d+-\d+-\d+) coco(?P<coco_class_id>\d+) cam(?P<cam_id>\d+) rect(?P<rectangle_x1>\d+)-(?P<rectangle_y1>\d+)-(?P<rectangle_x2>\d+)-(?P<rectangle_y2>\d+) frame(?P<frame_x>\d+)-(?P<frame_y>\d+) conf(?P<conf>\d+).jpg",
-            filename
-        )
+        match : re.Match = self._FILENAME_PATTERN.fullmatch( filename )
         if match is None:
             return None
         
@@ -125,14 +157,51 @@ class DetectionHistory:
         cam_id = parse_int("cam_id")
         confidence_percentage = parse_int("conf")
         xyxy_coords = [parse_int("rectangle_x1"),parse_int("rectangle_y1"),parse_int("rectangle_x2"),parse_int("rectangle_y2")]
-        frame_size = Point2D( x=parse_float("frame_x"), y=parse_float("frame_y"))
         if any( [item is None for item in [coco_class_id, cam_id, confidence_percentage] + xyxy_coords] ):
             return None
 
+        if match.group("frame_x") is not None:
+            frame_size = Point2D( x=parse_float("frame_x"), y=parse_float("frame_y"))
+        else:
+            # older file names do not carry the frame size, take it from the JPEG header instead
+            frame_size = self._read_jpeg_size( self._FOLDER / filename )
+            if frame_size is None:
+                return None
+
         sv_detection  = SvDetection( xyxy_coords=xyxy_coords, confidence=confidence_percentage/100, coco_class_id=coco_class_id )
         
         return ObjectDetectionInfo( cam_id=cam_id, supervision=sv_detection, when=when, frame_size=frame_size )
 
+    @staticmethod
+    def _read_jpeg_size( path : pathlib.Path ) -> "Point2D[int] | None":
+        """
+        Read image size from the JPEG start-of-frame segment without decoding the image.
+
+        Returns: size or None if the file is not a readable JPEG.
+        """
+        try:
+            with open( path, "rb" ) as file:
+                if file.read(2) != b"\xff\xd8":
+                    return None
+                while True:
+                    marker = file.read(2)
+                    while len(marker) == 2 and marker[1] == 0xff: # fill bytes
+                        marker = marker[1:] + file.read(1)
+                    if len(marker) < 2 or marker[0] != 0xff:
+                        return None
+                    if marker[1] in _JPEG_START_OF_FRAME_MARKERS:
+                        segment = file.read(7) # length, precision, height, width
+                        if len(segment) < 7:
+                            return None
+                        height, width = struct.unpack( ">HH", segment[3:7] )
+                        return Point2D( x=width, y=height )
+                    length_bytes = file.read(2)
+                    if len(length_bytes) < 2:
+                        return None
+                    file.seek( struct.unpack( ">H", length_bytes )[0] - 2, os.SEEK_CUR )
+        except OSError:
+            return None
+
     @staticmethod
     def _detection_info_to_filename(detection : ObjectDetectionInfo) -> pathlib.Path:
         sv_detection = detection.supervision
@@ -1,7 +1,9 @@
 import pathlib
 import typing
-import statistics
 import functools
+import collections
+import dataclasses
+import numpy
 from .interface import (
     Configuration,
 )
@@ -23,16 +25,213 @@ import PySide6.QtWidgets
 import PySide6.QtGui
 import PySide6.QtCore
 
+class _DetectionHistoryModel(PySide6.QtCore.QAbstractTableModel):
+    """Flat model over the detection history, the view only materializes visible rows."""
+
+    IGNORE_COLUMN = 5
+    _TIME_FORMAT = r"%Y-%m-%d %H:%M:%S"
+
+    _configuration : Configuration
+    _detections : list[ObjectDetectionInfo]
+    _row_strings : list[list[str]]
+    _interest_label_cache : dict[int,str] # the configuration does not change at runtime
+    _cam_label_cache : dict[int,str]
+
+    def __init__( self, configuration : Configuration ):
+        super().__init__()
+        self._configuration = configuration
+        self._detections = []
+        self._row_strings = []
+        self._interest_label_cache = dict()
+        self._cam_label_cache = dict()
+
+    def rowCount( self, parent : PySide6.QtCore.QModelIndex = PySide6.QtCore.QModelIndex() ) -> int:
+        return 0 if parent.isValid() else len(self._detections)
+
+    def columnCount( self, parent : PySide6.QtCore.QModelIndex = PySide6.QtCore.QModelIndex() ) -> int:
+        return 0 if parent.isValid() else self.IGNORE_COLUMN + 1
+
+    def data( self, index : PySide6.QtCore.QModelIndex, role : int = PySide6.QtCore.Qt.ItemDataRole.DisplayRole ) -> typing.Any:
+        if not index.isValid() or role != PySide6.QtCore.Qt.ItemDataRole.DisplayRole:
+            return None
+        if index.column() == self.IGNORE_COLUMN:
+            return self._configuration.get_text("Ignore in future")
+        return self._row_strings[index.row()][index.column()]
+
+    def get_detection( self, row : int ) -> ObjectDetectionInfo:
+        return self._detections[row]
+
+    def append( self, detection : ObjectDetectionInfo ) -> None:
+        self.extend( [detection] )
+
+    def extend( self, detections : list[ObjectDetectionInfo] ) -> None:
+        """Append detections with a single insert notification."""
+        if len(detections) == 0:
+            return
+        first_row = len(self._detections)
+        self.beginInsertRows( PySide6.QtCore.QModelIndex(), first_row, first_row + len(detections) - 1 )
+        self._detections.extend( detections )
+        self._row_strings.extend( [self._format_label_strings( detection ) for detection in detections] )
+        self.endInsertRows()
+
+    def remove( self, removed_detection : ObjectDetectionInfo ) -> None:
+        row = self._find_row( removed_detection )
+        self.beginRemoveRows( PySide6.QtCore.QModelIndex(), row, row )
+        del self._detections[row]
+        del self._row_strings[row]
+        self.endRemoveRows()
+
+    def _find_row( self, detection : ObjectDetectionInfo ) -> int:
+        # the history drops its oldest entries, so the first row is the one nearly every time
+        if len(self._detections) > 0 and self._detections[0] is detection:
+            return 0
+        for row, existing_detection in enumerate( self._detections ):
+            if existing_detection is detection:
+                return row
+        raise ValueError("Detection not found.")
+
+    def _format_label_strings( self, detection : ObjectDetectionInfo ) -> list[str]:
+        return [
+            detection.when.strftime(self._TIME_FORMAT),
+            self._get_interest_label( detection.supervision.coco_class_id ),
+            self._get_cam_label( detection.cam_id ),
+            str([int(coord) for coord in detection.supervision.xyxy_coords]),
+            f"{detection.supervision.confidence*100:.0f} %"
+        ]
+
+    def _get_interest_label( self, coco_class_id : int ) -> str:
+        label = self._interest_label_cache.get( coco_class_id )
+        if label is None:
+            if self._configuration.is_defined_interest( coco_class_id ):
+                label = self._configuration.get_interest( coco_class_id ).label
+            else:
+                label = self._configuration.get_text("Undefined id") + f" {coco_class_id}"
+            self._interest_label_cache[coco_class_id] = label
+        return label
+
+    def _get_cam_label( self, cam_id : int ) -> str:
+        label = self._cam_label_cache.get( cam_id )
+        if label is None:
+            if self._configuration.is_defined_cam( cam_id ):
+                label = self._configuration.get_cam_definition( cam_id ).label
+            else:
+                label = self._configuration.get_text("Undefined id")+ f" {cam_id}"
+            self._cam_label_cache[cam_id] = label
+        return label
+
+class _IgnoreButtonDelegate(PySide6.QtWidgets.QStyledItemDelegate):
+    """Paints the ignore button instead of placing a real QPushButton in every row."""
+
+    _on_click : typing.Callable[[ObjectDetectionInfo],None]
+    _view : PySide6.QtWidgets.QAbstractItemView
+    _pressed_index : PySide6.QtCore.QPersistentModelIndex | None # follows the row when earlier rows are trimmed
+
+    def __init__( self, on_click : typing.Callable[[ObjectDetectionInfo],None], view : PySide6.QtWidgets.QAbstractItemView ):
+        super().__init__( view )
+        self._on_click = on_click
+        self._view = view
+        self._pressed_index = None
+        # the release may land outside the button or the viewport, editorEvent would not see it then
+        view.viewport().installEventFilter( self )
+
+    def _make_button_option( self, option : PySide6.QtWidgets.QStyleOptionViewItem, index : PySide6.QtCore.QModelIndex ) -> PySide6.QtWidgets.QStyleOptionButton:
+        button_option = PySide6.QtWidgets.QStyleOptionButton()
+        button_option.rect = option.rect
+        button_option.text = index.data()
+        button_option.fontMetrics = option.fontMetrics
+        button_option.state = PySide6.QtWidgets.QStyle.StateFlag.State_Enabled
+        if self._pressed_index is not None and self._pressed_index == index:
+            button_option.state |= PySide6.QtWidgets.QStyle.StateFlag.State_Sunken
+        else:
+            button_option.state |= PySide6.QtWidgets.QStyle.StateFlag.State_Raised
+        return button_option
+
+    def paint( self, painter : PySide6.QtGui.QPainter, option : PySide6.QtWidgets.QStyleOptionViewItem, index : PySide6.QtCore.QModelIndex ) -> None:
+        style = option.widget.style() if option.widget is not None else PySide6.QtWidgets.QApplication.style()
+        style.drawControl( PySide6.QtWidgets.QStyle.ControlElement.CE_PushButton, self._make_button_option( option, index ), painter, option.widget )
+
+    def sizeHint( self, option : PySide6.QtWidgets.QStyleOptionViewItem, index : PySide6.QtCore.QModelIndex ) -> PySide6.QtCore.QSize:
+        style = option.widget.style() if option.widget is not None else PySide6.QtWidgets.QApplication.style()
+        text_size = option.fontMetrics.size( PySide6.QtCore.Qt.TextFlag.TextShowMnemonic, index.data() )
+        return style.sizeFromContents( PySide6.QtWidgets.QStyle.ContentsType.CT_PushButton, self._make_button_option( option, index ), text_size, option.widget )
+
+    def editorEvent( self, event : PySide6.QtCore.QEvent, model : PySide6.QtCore.QAbstractItemModel, option : PySide6.QtWidgets.QStyleOptionViewItem, index : PySide6.QtCore.QModelIndex ) -> bool:
+        if event.type() == PySide6.QtCore.QEvent.Type.MouseButtonPress and event.button() == PySide6.QtCore.Qt.MouseButton.LeftButton:
+            self._pressed_index = PySide6.QtCore.QPersistentModelIndex( index )
+            self._view.update( index )
+            return True
+        return super().editorEvent( event, model, option, index )
+
+    def eventFilter( self, watched : PySide6.QtCore.QObject, event : PySide6.QtCore.QEvent ) -> bool:
+        if ( event.type() == PySide6.QtCore.QEvent.Type.MouseButtonRelease
+             and event.button() == PySide6.QtCore.Qt.MouseButton.LeftButton
+             and self._pressed_index is not None ):
+            pressed_index = self._pressed_index
+            self._pressed_index = None
+            if pressed_index.isValid(): # invalid once the pressed detection has been trimmed
+                index = PySide6.QtCore.QModelIndex( pressed_index )
+                self._view.update( index )
+                if self._view.visualRect( index ).contains( event.position().toPoint() ):
+                    self._on_click( typing.cast( _DetectionHistoryModel, index.model() ).get_detection( index.row() ) )
+        return super().eventFilter( watched, event )
+
+@dataclasses.dataclass
+class _DecodedImage:
+    detection : ObjectDetectionInfo
+    image : PySide6.QtGui.QImage
+    image_data : numpy.ndarray # pixel buffer borrowed by image, must outlive it
+
+class _DecodeSignals(PySide6.QtCore.QObject):
+    decoded = PySide6.QtCore.Signal( _DecodedImage )
+
+class _DecodeWorker(PySide6.QtCore.QRunnable):
+    """Loads a saved detection image on a pool thread, QPixmap conversion is left to the GUI thread."""
+
+    _detection_history : DetectionHistory
+    _detection : ObjectDetectionInfo
+    _signals : _DecodeSignals
+    _error_handler : ErrorHandler
+
+    def __init__( self, detection_history : DetectionHistory, detection : ObjectDetectionInfo, signals : _DecodeSignals, error_handler : ErrorHandler ):
+        super().__init__()
+        self._detection_history = detection_history
+        self._detection = detection
+        self._signals = signals
+        self._error_handler = error_handler
+
+    def graceful_handler( handler ):
+        @functools.wraps( handler )
+        def wrapped_handler( self : '_DecodeWorker', *args, **kwargs ):
+            self._error_handler.handle_gracefully_internal( handler, self, *args, **kwargs )
+        return wrapped_handler
+
+    @graceful_handler
+    def run(self) -> None:
+        try:
+            image_data = self._detection_history.get_detection_image_data( self._detection )
+        except FileNotFoundError:
+            return # trimmed from the history meanwhile, the view has dropped the pending decode already
+        image = PySide6.QtGui.QImage( image_data, image_data.shape[1], image_data.shape[0], image_data.strides[0], PySide6.QtGui.QImage.Format.Format_RGB888)
+        self._signals.decoded.emit( _DecodedImage( detection=self._detection, image=image, image_data=image_data ) )
+
 class DetectionHistoryView(PySide6.QtWidgets.QFrame):
     _FOLDER = pathlib.Path("detections/")
+    _MAX_CACHED_PIXMAPS = 16 # full frame pixmaps, keep this small
 
     _configuration : Configuration
     _error_handler : ErrorHandler
     _add_to_ignore : typing.Callable[[IgnorePoint],None]
 
     _detection_history : DetectionHistory
-    _detection_list_widget : PySide6.QtWidgets.QTreeWidget
+    _detection_list_model : _DetectionHistoryModel
+    _detection_list_widget : PySide6.QtWidgets.QTreeView
     _detection_display : LiveView
+    _empty_image : PySide6.QtGui.QPixmap # implicitly shared, no need to rebuild it for every clear
+    _adjust_width_timer : PySide6.QtCore.QTimer
+    _pixmap_cache : collections.OrderedDict[int,PySide6.QtGui.QPixmap] # by id() of the detection, least recently used first
+    _decode_pool : PySide6.QtCore.QThreadPool
+    _decode_signals : _DecodeSignals
+    _pending_decode_detection : ObjectDetectionInfo | None
 
     def __init__( self,
                   detection_history : DetectionHistory,
@@ -44,37 +243,57 @@ class DetectionHistoryView(PySide6.QtWidgets.QFrame):
         self._configuration = configuration
         self._error_handler = error_handler
         self._add_to_ignore = add_to_ignore
+        self._pixmap_cache = collections.OrderedDict()
+        self._pending_decode_detection = None
+        self._decode_pool = PySide6.QtCore.QThreadPool()
+        self._decode_pool.setMaxThreadCount( 1 )
+        self._decode_signals = _DecodeSignals()
+        self._decode_signals.decoded.connect( self._on_decoded )
 
         detection_list_layout = PySide6.QtWidgets.QHBoxLayout()
         self.setLayout(detection_list_layout)
-        self._detection_list_widget = PySide6.QtWidgets.QTreeWidget()
+        self._detection_list_model = _DetectionHistoryModel( self._configuration )
+        self._detection_list_widget = PySide6.QtWidgets.QTreeView()
+        self._detection_list_widget.setModel( self._detection_list_model )
+        self._detection_list_widget.setUniformRowHeights( True )
+        self._detection_list_widget.setItemDelegateForColumn(
+            _DetectionHistoryModel.IGNORE_COLUMN,
+            _IgnoreButtonDelegate( self._ignore, self._detection_list_widget )
+        )
         self._detection_list_widget.setSizePolicy( PySide6.QtWidgets.QSizePolicy.Policy.Expanding, PySide6.QtWidgets.QSizePolicy.Policy.Expanding )
-        self._detection_list_widget.setColumnCount( 6 )
         self._detection_list_widget.setHeaderHidden(  True )
         self._detection_list_widget.setSelectionMode( PySide6.QtWidgets.QListWidget.SelectionMode.SingleSelection )
         self._detection_list_widget.setSelectionBehavior( PySide6.QtWidgets.QListWidget.SelectionBehavior.SelectRows )
         detection_list_layout.addWidget( self._detection_list_widget )
         detection_list_layout.setStretch( 0, 100)
-        empty_image = PySide6.QtGui.QPixmap(16,9)
-        empty_image.fill( PySide6.QtGui.QColorConstants.Gray )
+        self._empty_image = PySide6.QtGui.QPixmap(16,9)
+        self._empty_image.fill( PySide6.QtGui.QColorConstants.Gray )
         self._detection_display = LiveView(
             self._configuration,
             self._error_handler,
-            empty_image,
+            self._empty_image,
         )
         detection_list_layout.addWidget( self._detection_display )
         detection_list_layout.setStretch( 1, 1)
-        self._detection_list_widget.currentItemChanged.connect( lambda: self._on_current_item_change() )
-        self._detection_list_widget.model().rowsInserted.connect( lambda: self._adjust_list_view_width() )       
-        self._detection_list_widget.model().rowsRemoved.connect( lambda: self._adjust_list_view_width() )
+        self._detection_list_widget.selectionModel().currentChanged.connect( lambda: self._on_current_item_change() )
+
+        self._detection_list_model.extend( self._detection_history.get_detections() )
+        self._adjust_list_view_width()
 
-        for detection in self._detection_history.get_detections():
-            self._append( detection )
+        # a burst of inserts/removals only needs one resize pass
+        self._adjust_width_timer = PySide6.QtCore.QTimer( self )
+        self._adjust_width_timer.setSingleShot( True )
+        self._adjust_width_timer.setInterval( 50 )
+        self._adjust_width_timer.timeout.connect( self._adjust_list_view_width )
+        self._detection_list_model.rowsInserted.connect( lambda: self._adjust_width_timer.start() )
+        self._detection_list_model.rowsRemoved.connect( lambda: self._adjust_width_timer.start() )
         
         self._detection_history.added_dispatcher.register( self._append )
         self._detection_history.removed_dispatcher.register( self._remove )
     
     def shut_down( self ) -> None:
+        self._decode_pool.clear()
+        self._decode_pool.waitForDone()
         self._detection_display.shut_down()
     
     def graceful_handler( handler ):
@@ -83,71 +302,61 @@ class DetectionHistoryView(PySide6.QtWidgets.QFrame):
             self._error_handler.handle_gracefully_internal( handler, self, *args, **kwargs )
         return wrapped_handler
 
-    def _set_item_detection( self, item_widget : PySide6.QtWidgets.QTreeWidgetItem, detection : ObjectDetectionInfo ) -> None:
-        item_widget.user_detection = detection
-    def _get_item_detection( self, item_widget : PySide6.QtWidgets.QTreeWidgetItem ) -> ObjectDetectionInfo:
-        return item_widget.user_detection
-    
     def _append(self, detection : ObjectDetectionInfo ):
-        if self._configuration.is_defined_interest( detection.supervision.coco_class_id ):
-            interest_label = self._configuration.get_interest( detection.supervision.coco_class_id ).label
-        else:
-            interest_label = self._configuration.get_text("Undefined id") + f" {detection.supervision.coco_class_id}"
-        
-        if self._configuration.is_defined_cam( detection.cam_id ):
-            cam_label = self._configuration.get_cam_definition( detection.cam_id ).label
-        else:
-            cam_label = self._configuration.get_text("Undefined id")+ f" {detection.cam_id}"
-        strings = [
-            detection.when.strftime(r"%Y-%m-%d %H:%M:%S"),
-            interest_label,
-            cam_label,
-            str([int(coord) for coord in detection.supervision.xyxy_coords]),
-            '%.0f %%' % (detection.supervision.confidence*100)
-        ]
-
-        item = PySide6.QtWidgets.QTreeWidgetItem( None, strings )
-        self._set_item_detection( item, detection )
-        self._detection_list_widget.addTopLevelItem(item)
-        button = PySide6.QtWidgets.QPushButton( self._configuration.get_text("Ignore in future") )
-        button.pressed.connect( lambda: self._ignore(detection) )
-        self._detection_list_widget.setItemWidget(item, 5, button)
+        self._detection_list_model.append( detection )
 
     def _remove(self, removed_detection : ObjectDetectionInfo ):
-        it = PySide6.QtWidgets.QTreeWidgetItemIterator(self._detection_list_widget)
-        while it.value():
-            item = it.value()
-            if self._get_item_detection(item) is removed_detection:
-                self._detection_list_widget.invisibleRootItem().removeChild( item )
-                return
-            it += 1
-        raise ValueError("Detection not found.")
+        self._pixmap_cache.pop( id(removed_detection), None ) # the id may be reused by a future detection
+        self._detection_list_model.remove( removed_detection )
  
     @graceful_handler
     def _on_current_item_change(self) -> None:
-        if self._detection_list_widget.currentIndex() is None:
-            empty_image = PySide6.QtGui.QPixmap(16,9)
-            empty_image.fill( PySide6.QtGui.QColorConstants.Gray )
-            self._detection_display.setPixmap( empty_image )
+        current_index = self._detection_list_widget.currentIndex()
+        if not current_index.isValid():
+            self._pending_decode_detection = None
+            self._detection_display.setPixmap( self._empty_image )
             return
         
-        item = self._detection_list_widget.currentItem()
-        image_data = self._detection_history.get_detection_image_data( self._get_item_detection( item ) )
-        image = PySide6.QtGui.QImage( image_data, image_data.shape[1], image_data.shape[0], image_data.strides[0], PySide6.QtGui.QImage.Format.Format_RGB888)
-        pixmap = PySide6.QtGui.QPixmap.fromImage( image )
+        detection = self._detection_list_model.get_detection( current_index.row() )
+        pixmap = self._pixmap_cache.get( id(detection) )
+        if pixmap is not None:
+            self._pending_decode_detection = None
+            self._pixmap_cache.move_to_end( id(detection) )
+            self._detection_display.setPixmap( pixmap )
+            return
+
+        # decode in the background, queued decodes for rows the user has already left are dropped
+        self._pending_decode_detection = detection
+        self._decode_pool.clear()
+        self._decode_pool.start( _DecodeWorker( self._detection_history, detection, self._decode_signals, self._error_handler ) )
+
+    @graceful_handler
+    def _on_decoded(self, decoded_image : _DecodedImage ) -> None:
+        if decoded_image.detection is not self._pending_decode_detection:
+            return # stale, the selection has moved on
+        self._pending_decode_detection = None
+
+        pixmap = PySide6.QtGui.QPixmap.fromImage( decoded_image.image, PySide6.QtCore.Qt.ImageConversionFlag.NoFormatConversion )
+        self._pixmap_cache[id(decoded_image.detection)] = pixmap
+        if len(self._pixmap_cache) > self._MAX_CACHED_PIXMAPS:
+            self._pixmap_cache.popitem( last=False )
         self._detection_display.setPixmap( pixmap )
     
     @graceful_handler
     def _ignore(self, detection : ObjectDetectionInfo ):
         xyxy_coords = detection.supervision.xyxy_coords
-        x = float( statistics.mean( [xyxy_coords[0], xyxy_coords[2]] ) / detection.frame_size.x )
-        y = float( statistics.mean( [xyxy_coords[1], xyxy_coords[3]] ) / detection.frame_size.y )
+        x = float( (xyxy_coords[0] + xyxy_coords[2]) * 0.5 / detection.frame_size.x )
+        y = float( (xyxy_coords[1] + xyxy_coords[3]) * 0.5 / detection.frame_size.y )
         self._add_to_ignore( IgnorePoint( coco_class_id=detection.supervision.coco_class_id, at=Point2D(x,y), cam_id=detection.cam_id ) )
 
     @graceful_handler
     def _adjust_list_view_width(self):
-        for i in range( 0, self._detection_list_widget.columnCount()):
-            self._detection_list_widget.resizeColumnToContents(i)
+        list_widget = self._detection_list_widget
+        total_width = 0
+        for i in range( 0, self._detection_list_model.columnCount()):
+            # same as resizeColumnToContents() with the header hidden, but the hint is measured only once
+            width = list_widget.sizeHintForColumn(i)
+            list_widget.setColumnWidth( i, width )
+            total_width += width
         
-        total_width = sum([self._detection_list_widget.sizeHintForColumn(i) for i in range(0, self._detection_list_widget.columnCount())])
-        self._detection_list_widget.setMaximumWidth( total_width + 50)
+        list_widget.setMaximumWidth( total_width + 50)
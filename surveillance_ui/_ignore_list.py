@@ -1,6 +1,8 @@
 import pathlib
 import pathlib
 import json
+import dataclasses
+import numpy
 import supervision
 from .interface import (
     Configuration,
@@ -8,7 +10,6 @@ from .interface import (
 )
 from ._common import (
     Point2D,
-    SvDetection,
     IgnorePoint,
 ) 
 from .utility import (
@@ -21,15 +22,24 @@ import PySide6.QtWidgets
 import PySide6.QtGui
 import PySide6.QtCore
 
+@dataclasses.dataclass
+class _IgnoreCoordinates:
+    """Ignore point coordinates of one (cam_id, coco_class_id) pair, replaced as a whole rather than modified so readers need no copy."""
+    xs : numpy.ndarray # ascending
+    ys : numpy.ndarray
+
 class IgnoreList(PySide6.QtWidgets.QFrame):
     _IGNORE_FILE = pathlib.Path("ignore_list.json")
     _IGNORE_FILE_NEW = pathlib.Path("ignore_list.new.json")
+    _BISECT_THRESHOLD = 64 # ignore points per cam and class above which bisecting beats a plain broadcast
 
     _configuration : Configuration
 
     _synchronized_ignore_list : Synchronized[list[IgnorePoint]]
+    _index : dict[tuple[int,int],_IgnoreCoordinates] # by (cam_id, coco_class_id), written under the ignore list lock, replaced rather than modified so readers need no lock
     _added_dispatcher : EventDispatcher[IgnorePoint]
     _removed_dispatcher : EventDispatcher[IgnorePoint]
+    _save_timer : PySide6.QtCore.QTimer # coalesces bursts of changes into one save
 
     def __init__( self,
                   configuration : Configuration ):
@@ -37,12 +47,19 @@ class IgnoreList(PySide6.QtWidgets.QFrame):
         self._configuration = configuration
 
         self._synchronized_ignore_list = Synchronized( list() )
+        self._index = dict()
         self._added_dispatcher = EventDispatcher()
         self._removed_dispatcher = EventDispatcher()
 
+        self._save_timer = PySide6.QtCore.QTimer( self )
+        self._save_timer.setSingleShot( True )
+        self._save_timer.setInterval( 250 )
+        self._save_timer.timeout.connect( self._save_ignore_list )
+
         with self._synchronized_ignore_list.lock() as ignore_list:
-            for ignore_point in self._load_ignore_list():
-                ignore_list.append( ignore_point )
+            ignore_list.extend( self._load_ignore_list() )
+            for key in { self._get_index_key( ignore_point ) for ignore_point in ignore_list }:
+                self._update_index( key, ignore_list )
 
     def get_ignore_points(self):
         with self._synchronized_ignore_list.lock() as ignore_list:
@@ -51,14 +68,26 @@ class IgnoreList(PySide6.QtWidgets.QFrame):
     def add(self, ignore_point : IgnorePoint ):
         with self._synchronized_ignore_list.lock() as ignore_list:
             ignore_list.append( ignore_point )
+            self._update_index( self._get_index_key( ignore_point ), ignore_list )
         self._added_dispatcher.fire(ignore_point)
-        self._save_ignore_list()
+        self._save_timer.start()
     
     def remove(self, ignore_point : IgnorePoint ):
         with self._synchronized_ignore_list.lock() as ignore_list:
             ignore_list.remove( ignore_point )
+            self._update_index( self._get_index_key( ignore_point ), ignore_list )
         self._removed_dispatcher.fire(ignore_point)
-        self._save_ignore_list()
+        self._save_timer.start()
+
+    def shut_down(self) -> None:
+        """
+        Write out any change still waiting for the save timer.
+
+        Must be called from the thread that owns the ignore list.
+        """
+        if self._save_timer.isActive():
+            self._save_timer.stop()
+            self._save_ignore_list()
 
     def filter_ignored( self, detections : supervision.Detections, cam_definition : CamDefinition, frame_size : Point2D[int] ) -> supervision.Detections:
         """
@@ -66,59 +95,108 @@ class IgnoreList(PySide6.QtWidgets.QFrame):
         
         Thread-safe.
         """
-        valid_detection_indices : list[int] = []
-        for index, detection in enumerate( SvDetection.list_from_sv_detections( detections ) ):
-            xyxy_coords=detection.xyxy_coords
-            area = float((xyxy_coords[2]-xyxy_coords[0])*(xyxy_coords[3]-xyxy_coords[1]))
-            if ( area < self._configuration.minimum_detection_area
-                 or
-                 self._is_ignored( detection.coco_class_id, cam_definition, xyxy_coords=xyxy_coords, frame_size=frame_size) ):
-                continue
-            valid_detection_indices.append( index )
+        minimum_detection_area = self._configuration.minimum_detection_area
+        # one snapshot serves the whole frame, a concurrent add/remove takes effect with the next frame
+        index = self._index # rebinding the attribute is atomic, the dict itself is never modified
+        is_ignore_list_empty = len(index) == 0
+
+        if is_ignore_list_empty and minimum_detection_area <= 0:
+            return detections # nothing to filter, the usual state until the user ignores something
+
+        xyxy = detections.xyxy
+        area = (xyxy[:,2]-xyxy[:,0])*(xyxy[:,3]-xyxy[:,1])
+        is_valid = area >= minimum_detection_area
+
+        if not is_ignore_list_empty:
+            # only the detections that are big enough need to be tested against the ignore points
+            candidate_rows = numpy.flatnonzero( is_valid )
+            is_valid[candidate_rows] = ~self._get_ignored_mask( index, detections.class_id[candidate_rows], cam_definition, xyxy=xyxy[candidate_rows], frame_size=frame_size )
         
-        return detections[valid_detection_indices]
+        return detections[is_valid]
 
-    def _is_ignored( self, coco_class_id : int, cam_definition : CamDefinition, xyxy_coords : list[float], frame_size : Point2D[int] ) -> bool:
+    def _get_ignored_mask( self, index : dict[tuple[int,int],_IgnoreCoordinates], coco_class_ids : numpy.ndarray, cam_definition : CamDefinition, xyxy : numpy.ndarray, frame_size : Point2D[int] ) -> numpy.ndarray:
         """
-        Tell whether a detection should be ignored.
+        Tell which detections should be ignored, detections of each class are tested against the matching ignore points at once.
 
-        Thread-safe.
+        Thread-safe as long as index is a snapshot of self._index.
+
+        Returns: boolean array, one item per detection
         """
-        min_x, min_y, max_x, max_y = [float(value) for value in xyxy_coords]
-        min_x /= frame_size.x
-        max_x /= frame_size.x
-        min_y /= frame_size.y
-        max_y /= frame_size.y
+        is_ignored = numpy.zeros( len(coco_class_ids), dtype=bool )
+        if len(coco_class_ids) == 0:
+            return is_ignored
 
-        with self._synchronized_ignore_list.lock() as ignore_list:
-            for ignore_point in ignore_list:
-                if ( ignore_point.coco_class_id == coco_class_id 
-                    and
-                    ignore_point.cam_id == cam_definition.id
-                    and
-                    min_x <= ignore_point.at.x and ignore_point.at.x <= max_x
-                    and
-                    min_y <= ignore_point.at.y and ignore_point.at.y <= max_y ):
-                    return True
-        
-        return False
+        # only the ignore points for this cam and the detected classes can match
+        detected_class_ids = numpy.unique( coco_class_ids )
+        candidates = [(class_id, index.get( (cam_definition.id, int(class_id)) )) for class_id in detected_class_ids]
+
+        # normalize all four coordinates of all detections in one operation
+        min_x, min_y, max_x, max_y = ( xyxy / numpy.array( [frame_size.x, frame_size.y, frame_size.x, frame_size.y], dtype=numpy.float64 ) ).T
+
+        for class_id, coordinates in candidates:
+            if coordinates is None:
+                continue
+            ignore_xs = coordinates.xs
+            ignore_ys = coordinates.ys
+
+            rows = coco_class_ids == class_id
+            if len(ignore_xs) > self._BISECT_THRESHOLD:
+                # bisect the x-sorted points down to the detection's horizontal span, then test only those
+                row_indices = numpy.flatnonzero( rows )
+                starts = numpy.searchsorted( ignore_xs, min_x[row_indices], side="left" )
+                ends = numpy.searchsorted( ignore_xs, max_x[row_indices], side="right" )
+                for row, start, end in zip( row_indices, starts, ends ):
+                    span_ys = ignore_ys[start:end]
+                    is_ignored[row] = bool( numpy.any( (min_y[row] <= span_ys) & (span_ys <= max_y[row]) ) )
+                continue
+
+            # detections of the class along the first axis, ignore points along the second
+            matches = (
+                (min_x[rows,None] <= ignore_xs[None,:]) & (ignore_xs[None,:] <= max_x[rows,None])
+                &
+                (min_y[rows,None] <= ignore_ys[None,:]) & (ignore_ys[None,:] <= max_y[rows,None])
+            )
+            is_ignored[rows] = matches.any( axis=1 )
+
+        return is_ignored
+
+    @staticmethod
+    def _get_index_key( ignore_point : IgnorePoint ) -> tuple[int,int]:
+        return (ignore_point.cam_id, ignore_point.coco_class_id)
+
+    def _update_index( self, key : tuple[int,int], ignore_list : list[IgnorePoint] ) -> None:
+        """
+        Rebuild the index entry for key from the ignore list.
+
+        Must be called with the ignore list locked.
+        """
+        index = self._index.copy() # readers may still hold the previous dict
+        ignore_points = [ignore_point for ignore_point in ignore_list if self._get_index_key( ignore_point ) == key]
+        if len(ignore_points) == 0:
+            index.pop( key, None )
+            self._index = index
+            return
+        xs = numpy.array( [ignore_point.at.x for ignore_point in ignore_points], dtype=numpy.float64 )
+        ys = numpy.array( [ignore_point.at.y for ignore_point in ignore_points], dtype=numpy.float64 )
+        order = numpy.argsort( xs, kind="stable" ) # sorted by x so that large sets can be bisected
+        index[key] = _IgnoreCoordinates( xs=xs[order], ys=ys[order] )
+        self._index = index
 
     def _load_ignore_list(self) -> list[IgnorePoint]:
-        ignore_points : list[IgnorePoint] = []
         try:
-            with open( self._IGNORE_FILE, "r") as file:
-                for item in json.load( file ):
-                    ignore_points.append(
-                        IgnorePoint(
-                            coco_class_id = int(item["coco_class_id"]),
-                            at = Point2D( float(item["x"]), float(item["y"]) ),
-                            cam_id = int(item["cam_id"])
-                        )
-                    )
+            items = json.loads( self._IGNORE_FILE.read_bytes() )
         except OSError:
-            pass # just start with empty list
-        
-        return ignore_points
+            return [] # just start with empty list
+
+        # the parsed dicts are dropped as soon as this returns rather than living alongside the list
+        return [
+            IgnorePoint(
+                coco_class_id = int(item["coco_class_id"]),
+                at = Point2D( float(item["x"]), float(item["y"]) ),
+                cam_id = int(item["cam_id"])
+            )
+            for item in items
+        ]
     
     def _ignore_point_to_dict( self, ignore_point : IgnorePoint ) -> dict:
         return {
@@ -129,10 +207,11 @@ class IgnoreList(PySide6.QtWidgets.QFrame):
         }
 
     def _save_ignore_list(self):
-        with open( self._IGNORE_FILE_NEW, "w") as file, self._synchronized_ignore_list.lock() as ignore_list:
-            json.dump( [self._ignore_point_to_dict( item ) for item in ignore_list] , file )
-        try:
-            self._IGNORE_FILE.unlink()
-        except FileNotFoundError:
-            pass
-        self._IGNORE_FILE_NEW.rename( self._IGNORE_FILE )
\ No newline at end of file
+        # hold the lock only for the snapshot, detection filtering must not wait for the disk
+        with self._synchronized_ignore_list.lock() as ignore_list:
+            serializable_ignore_list = [self._ignore_point_to_dict( item ) for item in ignore_list]
+        # dumps() encodes in one C call, dump() would feed the file chunk by chunk from the Python encoder
+        serialized_ignore_list = json.dumps( serializable_ignore_list )
+        self._IGNORE_FILE_NEW.write_text( serialized_ignore_list )
+        # replace() swaps the file in a single step, there is no moment without an ignore list on disk
+        self._IGNORE_FILE_NEW.replace( self._IGNORE_FILE )
\ No newline at end of file
@@ -1,4 +1,5 @@
 import functools
+import math
 import typing
 from .interface import (
     Configuration,
@@ -30,6 +31,15 @@ class IgnoreListView(PySide6.QtWidgets.QFrame):
 
     _ignore_list_widget : PySide6.QtWidgets.QTreeWidget
     _ignore_item_display : LiveView
+    _empty_image : PySide6.QtGui.QPixmap
+    _empty_preview_image : PySide6.QtGui.QPixmap
+    _adjust_width_timer : PySide6.QtCore.QTimer
+    _is_width_adjust_pending : bool # set while hidden, the adjustment runs when the view is shown
+    _cam_label_cache : dict[int,str] # the configuration does not change at runtime
+    _interest_label_cache : dict[int,str]
+    _item_by_ignore_point_id : dict[int,PySide6.QtWidgets.QTreeWidgetItem] # ignore points are matched by identity
+    _marker_cache : dict[float,PySide6.QtGui.QPixmap] # keyed by scale, there are only as many as distinct frame sizes
+    _last_render : typing.Optional[tuple[IgnorePoint,int,PySide6.QtGui.QPixmap]] # ignore point, source image cache key, result
 
     def __init__( self,
                   ignore_list : IgnoreList,
@@ -41,6 +51,12 @@ class IgnoreListView(PySide6.QtWidgets.QFrame):
         self._configuration = configuration
         self._error_handler = error_handler
         self._get_cam_image = get_cam_image
+        self._cam_label_cache = dict()
+        self._interest_label_cache = dict()
+        self._item_by_ignore_point_id = dict()
+        self._marker_cache = dict()
+        self._last_render = None
+        self._is_width_adjust_pending = False
 
         ignore_list_layout = PySide6.QtWidgets.QHBoxLayout()
         self.setLayout(ignore_list_layout)
@@ -52,21 +68,38 @@ class IgnoreListView(PySide6.QtWidgets.QFrame):
         self._ignore_list_widget.setSelectionBehavior( PySide6.QtWidgets.QListWidget.SelectionBehavior.SelectRows )
         ignore_list_layout.addWidget( self._ignore_list_widget )
         ignore_list_layout.setStretch( 0, 100)
-        empty_image = PySide6.QtGui.QPixmap(16,9)
-        empty_image.fill( PySide6.QtGui.QColorConstants.Gray )
+        self._empty_image = PySide6.QtGui.QPixmap(16,9)
+        self._empty_image.fill( PySide6.QtGui.QColorConstants.Gray )
+        self._empty_preview_image = PySide6.QtGui.QPixmap( self._PREVIEW_SIZE.x , self._PREVIEW_SIZE.y )
+        self._empty_preview_image.fill( PySide6.QtGui.QColorConstants.Gray )
         self._ignore_item_display = LiveView(
             self._configuration,
             self._error_handler,
-            empty_image,
+            self._empty_image,
         )        
         ignore_list_layout.addWidget( self._ignore_item_display )
         ignore_list_layout.setStretch( 1, 1)
         self._ignore_list_widget.currentItemChanged.connect( lambda: self._on_current_item_change() )
-        self._ignore_list_widget.model().rowsInserted.connect( lambda: self._adjust_list_view_width() )       
-        self._ignore_list_widget.model().rowsRemoved.connect( lambda: self._adjust_list_view_width() )
 
-        for ignore_point in self._ignore_list.get_ignore_points():
-            self._append( ignore_point )
+        # insert the saved ignore points in one go and size the columns once afterwards
+        self._ignore_list_widget.setUpdatesEnabled( False )
+        try:
+            ignore_points = self._ignore_list.get_ignore_points()
+            items = [self._make_item( ignore_point ) for ignore_point in ignore_points]
+            self._ignore_list_widget.addTopLevelItems( items )
+            for item, ignore_point in zip( items, ignore_points ):
+                self._add_remove_button( item, ignore_point )
+        finally:
+            self._ignore_list_widget.setUpdatesEnabled( True )
+        self._adjust_list_view_width()
+
+        # a burst of inserts/removals only needs one resize pass
+        self._adjust_width_timer = PySide6.QtCore.QTimer( self )
+        self._adjust_width_timer.setSingleShot( True )
+        self._adjust_width_timer.setInterval( 50 )
+        self._adjust_width_timer.timeout.connect( self._adjust_list_view_width )
+        self._ignore_list_widget.model().rowsInserted.connect( lambda: self._adjust_width_timer.start() )
+        self._ignore_list_widget.model().rowsRemoved.connect( lambda: self._adjust_width_timer.start() )
         
         self._ignore_list._added_dispatcher.register( self._append )
         self._ignore_list._removed_dispatcher.register( self._remove )
@@ -86,79 +119,119 @@ class IgnoreListView(PySide6.QtWidgets.QFrame):
         return item_widget.user_ignore_point
     
     def _append(self, ignore_point : IgnorePoint ) -> None:
-        if self._configuration.is_defined_cam( ignore_point.cam_id ):
-            cam_label = self._configuration.get_cam_definition( ignore_point.cam_id ).label
-        else:
-            cam_label = self._configuration.get_text("Undefined id") + f" {ignore_point.cam_id}"
-        
-        try:
-            interest_label = self._configuration.get_interest( ignore_point.coco_class_id ).label
-        except ValueError:
-            interest_label = self._configuration.get_text("Undefined id") + f" {ignore_point.coco_class_id}"
+        item = self._make_item( ignore_point )
+        self._ignore_list_widget.addTopLevelItem(item)
+        self._add_remove_button( item, ignore_point )
 
+    def _make_item(self, ignore_point : IgnorePoint ) -> PySide6.QtWidgets.QTreeWidgetItem:
         strings = [
-            cam_label,
-            interest_label,
+            self._get_cam_label( ignore_point.cam_id ),
+            self._get_interest_label( ignore_point.coco_class_id ),
             str( [ignore_point.at.x, ignore_point.at.y] )
         ]
         item = PySide6.QtWidgets.QTreeWidgetItem( None, strings )
         self._set_item_ignore_point( item, ignore_point )
-        self._ignore_list_widget.addTopLevelItem(item)
+        self._item_by_ignore_point_id[id( ignore_point )] = item
+        return item
 
+    def _add_remove_button(self, item : PySide6.QtWidgets.QTreeWidgetItem, ignore_point : IgnorePoint ) -> None:
+        """Add the remove button, the item must already be in the tree."""
         button = PySide6.QtWidgets.QPushButton(" ✖ ")      
-        button.pressed.connect( lambda: self._remove_from_model(ignore_point) )
+        button.user_ignore_point = ignore_point
+        button.pressed.connect( self._on_remove_button_pressed ) # one shared slot rather than a closure per row
         self._ignore_list_widget.setItemWidget(item, 3, button)
 
+    def _get_cam_label( self, cam_id : int ) -> str:
+        label = self._cam_label_cache.get( cam_id )
+        if label is None:
+            if self._configuration.is_defined_cam( cam_id ):
+                label = self._configuration.get_cam_definition( cam_id ).label
+            else:
+                label = self._configuration.get_text("Undefined id") + f" {cam_id}"
+            self._cam_label_cache[cam_id] = label
+        return label
+
+    def _get_interest_label( self, coco_class_id : int ) -> str:
+        label = self._interest_label_cache.get( coco_class_id )
+        if label is None:
+            try:
+                label = self._configuration.get_interest( coco_class_id ).label
+            except ValueError:
+                label = self._configuration.get_text("Undefined id") + f" {coco_class_id}"
+            self._interest_label_cache[coco_class_id] = label
+        return label
 
     def _remove(self, removed_ignore_point : IgnorePoint ):
-        it = PySide6.QtWidgets.QTreeWidgetItemIterator(self._ignore_list_widget)
-        while it.value():
-            item = it.value()
-            if self._get_item_ignore_point(item) is removed_ignore_point:
-                self._ignore_list_widget.invisibleRootItem().removeChild( item )
-                return
-            it += 1
-        raise ValueError("Ignore point not found.")
+        item = self._item_by_ignore_point_id.pop( id( removed_ignore_point ), None )
+        if item is None:
+            raise ValueError("Ignore point not found.")
+        self._ignore_list_widget.invisibleRootItem().removeChild( item )
 
     @graceful_handler
-    def _remove_from_model(self, ignore_point : IgnorePoint ) -> None:
-        self._ignore_list.remove( ignore_point )
+    def _on_remove_button_pressed(self) -> None:
+        self._ignore_list.remove( self.sender().user_ignore_point )
     
     @graceful_handler
     def _on_current_item_change(self) -> None:
         if self._ignore_list_widget.currentItem() is None:
-            empty_image = PySide6.QtGui.QPixmap(16,9)
-            empty_image.fill( PySide6.QtGui.QColorConstants.Gray )
-            self._ignore_item_display.setPixmap( empty_image )
+            self._ignore_item_display.setPixmap( self._empty_image )
             return
         
         item = self._ignore_list_widget.currentItem()
         ignore_point = self._get_item_ignore_point(item)
         if self._configuration.is_defined_cam( ignore_point.cam_id ):
             image = self._get_cam_image( ignore_point.cam_id )
+            if self._last_render is not None:
+                last_ignore_point, last_cache_key, last_image = self._last_render
+                if last_ignore_point is ignore_point and last_cache_key == image.cacheKey():
+                    self._ignore_item_display.setPixmap( last_image )
+                    return
         else:
             image = PySide6.QtGui.QPixmap(160,90)
             image.fill( PySide6.QtGui.QColorConstants.Black )
 
+        source_cache_key = image.cacheKey() # painting below detaches the pixmap and changes its key
         if image.isNull():
-            image = PySide6.QtGui.QPixmap( self._PREVIEW_SIZE.x , self._PREVIEW_SIZE.y )
-            image.fill( PySide6.QtGui.QColorConstants.Gray )
+            image = PySide6.QtGui.QPixmap( self._empty_preview_image ) # shallow copy, the painter detaches it
+        scale = min( image.size().width(), image.size().height() ) / min( self._PREVIEW_SIZE.x, self._PREVIEW_SIZE.y )
+        scale = max( 1, scale )
+        marker = self._get_marker( scale )
+        at_screen_point = PySide6.QtCore.QPoint( int(ignore_point.at.x * image.size().width()), int(ignore_point.at.y * image.size().height()) )
         with PySide6.QtGui.QPainter( image ) as painter:
-            scale = min( image.size().width(), image.size().height() ) / min( self._PREVIEW_SIZE.x, self._PREVIEW_SIZE.y )
-            scale = max( 1, scale )
-            def set_color(color):
-                painter.setPen( PySide6.QtGui.QPen( color, scale ) )    
-            at_screen_point = PySide6.QtCore.QPoint( int(ignore_point.at.x * image.size().width()), int(ignore_point.at.y * image.size().height()) )
-            set_color( PySide6.QtGui.QColorConstants.White )
-            painter.drawEllipse( at_screen_point, 3*scale, 3*scale )
-            set_color( PySide6.QtGui.QColorConstants.Red )
-            painter.drawEllipse( at_screen_point, 4*scale, 4*scale )
-            set_color( PySide6.QtGui.QColorConstants.White )
-            painter.drawEllipse( at_screen_point, 5*scale, 5*scale )
+            painter.drawPixmap( at_screen_point - marker.rect().center(), marker )
+        self._last_render = (ignore_point, source_cache_key, image)
         self._ignore_item_display.setPixmap( image )
+
+    def _get_marker( self, scale : float ) -> PySide6.QtGui.QPixmap:
+        marker = self._marker_cache.get( scale )
+        if marker is None:
+            size = 2 * math.ceil( 6*scale ) + 1 # outermost circle plus its pen width
+            marker = PySide6.QtGui.QPixmap( size, size )
+            marker.fill( PySide6.QtGui.QColorConstants.Transparent )
+            center = marker.rect().center()
+            with PySide6.QtGui.QPainter( marker ) as painter:
+                def set_color(color):
+                    painter.setPen( PySide6.QtGui.QPen( color, scale ) )
+                set_color( PySide6.QtGui.QColorConstants.White )
+                painter.drawEllipse( center, 3*scale, 3*scale )
+                set_color( PySide6.QtGui.QColorConstants.Red )
+                painter.drawEllipse( center, 4*scale, 4*scale )
+                set_color( PySide6.QtGui.QColorConstants.White )
+                painter.drawEllipse( center, 5*scale, 5*scale )
+            self._marker_cache[scale] = marker
+        return marker
     
+    def showEvent( self, event : PySide6.QtGui.QShowEvent ) -> None:
+        super().showEvent( event )
+        if self._is_width_adjust_pending:
+            self._adjust_list_view_width()
+
     @graceful_handler
     def _adjust_list_view_width(self):
+        if not self.isVisible():
+            self._is_width_adjust_pending = True # the tab may never be opened, no point sizing columns now
+            return
+        self._is_width_adjust_pending = False
         for i in range( 0, self._ignore_list_widget.columnCount()):
             self._ignore_list_widget.resizeColumnToContents(i)
         
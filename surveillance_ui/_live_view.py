@@ -18,6 +18,16 @@ from .error_handler import (
 )
 
 class LiveView(PySide6.QtWidgets.QWidget):
+    _OVERLAY_OPACITY_STEPS = 16 # the blinking overlay is drawn at this many distinct opacities
+    _DISCONNECTION_IMAGE_PATH = "surveillance_ui/disconnected_icon.png"
+    _BLINK_PERIOD_SECONDS = 2.0
+    _BLINK_HIDDEN_RATIO = 0.4 # ratio of period during which the indicator overlay should be hidden so the user can actually see the last frame unobstructed
+    _MAGNIFICATION_TABLE_LIMIT = 40 # zoom level differences within +-limit are looked up rather than computed
+    _MAGNIFICATIONS = tuple( pow( 1.2, i ) for i in range( -_MAGNIFICATION_TABLE_LIMIT, _MAGNIFICATION_TABLE_LIMIT+1 ) )
+
+    # every tile shows the same indicator, load it once and share the composed opacity steps
+    _shared_disconnection_image : PySide6.QtGui.QPixmap = None
+    _shared_overlay_cache : dict[int,PySide6.QtGui.QPixmap] = dict()
 
     # image_offset = QPointF where coordinates of the full image range from -0.5 to 0.5. ( -0.5; -0.5) corresponds to pixel ( 0; 0),  ( 0.5; 0.5) corresponds to pixel ( width; height).
     # view_offset = QPointF where coordinates of the currently displayed view of the image range from -0.5 to 0.5.
@@ -29,25 +39,33 @@ class LiveView(PySide6.QtWidgets.QWidget):
     _zoom_level : int
     _focus_image_offset : PySide6.QtCore.QPointF
     _fitting_image : FittingImage
+    _matrix_cache_key : tuple
+    _matrix_cache : PySide6.QtGui.QTransform
+    _is_apply_pending : bool # frames and view changes arriving in a burst are composed once
     _controls_widget : PySide6.QtWidgets.QWidget
     _volume_slider : PySide6.QtWidgets.QSlider
     _disconnection_indicator : PySide6.QtWidgets.QLabel
     _disconnection_image : PySide6.QtGui.QPixmap
+    _overlay_cache : dict[int,PySide6.QtGui.QPixmap] # disconnection image by opacity step, shared by all instances
+    _overlay_opacity_step : int
 
     _last_frame_time_monotonic : float
+    _disconnect_delay_seconds : float
 
     _drag_pivot_image_offset : PySide6.QtCore.QPointF
-    _drag_timer : PySide6.QtCore.QTimer
     
     def __init__( self, configuration : Configuration, error_handler : ErrorHandler, initial_pixmap : PySide6.QtGui.QPixmap, on_volume_change : typing.Callable[[float],None] = None ):
         super().__init__()
 
         self._configuration = configuration
         self._error_handler = error_handler
+        self._disconnect_delay_seconds = self._configuration.get_disconnect_indicator_delay().total_seconds() # the configuration does not change at runtime
 
         self._last_frame_time_monotonic = None
         self._drag_pivot_image_offset = None
-        self._drag_timer = None
+        self._matrix_cache_key = None
+        self._matrix_cache = None
+        self._is_apply_pending = False
 
         self._fitting_image = FittingImage( 5*16, 5*9 , self._error_handler )
 
@@ -77,10 +95,10 @@ class LiveView(PySide6.QtWidgets.QWidget):
         controls_layout.setAlignment( PySide6.QtCore.Qt.AlignmentFlag.AlignBottom )
         controls_layout.addStretch(1)
 
+        small_font = self.font() # one font shared by all controls rather than a copy per widget
+        small_font.setPointSize(8)
         def set_font_size(widget : PySide6.QtWidgets.QWidget):
-            font = widget.font()
-            font.setPointSize(8)
-            widget.setFont(font)
+            widget.setFont(small_font)
         
         def make_button( text ):
             button = PySide6.QtWidgets.QPushButton( text=text )
@@ -89,12 +107,12 @@ class LiveView(PySide6.QtWidgets.QWidget):
         
         def make_arrow_button( vector, text ):
             button = make_button( text )
-            button.pressed.connect( lambda: self._nudge( vector ) )
+            button.pressed.connect( functools.partial( self._nudge, vector ) )
             return button
 
         def make_magnifier_button( delta, text ):
             button = make_button( text )
-            button.pressed.connect( lambda: self._zoom( delta ) )
+            button.pressed.connect( functools.partial( self._zoom, delta ) )
             return button
 
         zoom_button_widget = PySide6.QtWidgets.QWidget()
@@ -126,7 +144,11 @@ class LiveView(PySide6.QtWidgets.QWidget):
 
         self._disconnection_indicator = PySide6.QtWidgets.QLabel()
         self._disconnection_indicator.setAttribute( PySide6.QtGui.Qt.WidgetAttribute.WA_TransparentForMouseEvents )
-        self._disconnection_image = PySide6.QtGui.QPixmap( "surveillance_ui/disconnected_icon.png" )
+        if LiveView._shared_disconnection_image is None:
+            LiveView._shared_disconnection_image = PySide6.QtGui.QPixmap( self._DISCONNECTION_IMAGE_PATH )
+        self._disconnection_image = LiveView._shared_disconnection_image
+        self._overlay_cache = LiveView._shared_overlay_cache
+        self._overlay_opacity_step = None
         self._disconnection_indicator.setSizePolicy( PySide6.QtWidgets.QSizePolicy.Policy.Fixed, PySide6.QtWidgets.QSizePolicy.Policy.Fixed )
         self._disconnection_indicator.setAlignment( PySide6.QtCore.Qt.AlignmentFlag.AlignCenter )
         layout.addWidget( self._disconnection_indicator )
@@ -140,9 +162,7 @@ class LiveView(PySide6.QtWidgets.QWidget):
         self.setPixmap( initial_pixmap, is_initial=True )
     
     def shut_down( self ) -> None:
-        if self._drag_timer is not None:
-            self._drag_timer.stop()
-            self._drag_timer = None
+        pass # dragging is driven by mouse events, there is nothing left running
     
     def graceful_handler( handler ):
         @functools.wraps( handler )
@@ -165,46 +185,45 @@ class LiveView(PySide6.QtWidgets.QWidget):
 
         cursor_view_offset = self._widget_pos_to_view_offset( event.position() )
         self._drag_pivot_image_offset = self._view_offset_to_image_offset( cursor_view_offset )
-        if self._drag_timer is None:
-            self._drag_timer = PySide6.QtCore.QTimer()
-            self._drag_timer.timeout.connect( self._drag_update )
-            self._drag_timer.setInterval(20)
-            self._drag_timer.start()
 
     @graceful_handler
-    def _drag_update( self ) -> None:
-        cursor_global_position = PySide6.QtGui.QCursor.pos()
-        cursor_widget_position = self.mapFromGlobal( cursor_global_position )
-        cursor_view_offset = self._widget_pos_to_view_offset( cursor_widget_position )
+    def mouseMoveEvent( self, event : PySide6.QtGui.QMouseEvent ) -> None:
+        # without mouse tracking this only arrives while a button is held
+        if self._drag_pivot_image_offset is None:
+            return
+
+        cursor_view_offset = self._widget_pos_to_view_offset( event.position() )
         cursor_image_offset = self._view_offset_to_image_offset( cursor_view_offset )
 
         self._focus_image_offset -= (cursor_image_offset - self._drag_pivot_image_offset)
         self._focus_image_offset = self._clamp_focus_image_offest( self._focus_image_offset, self._zoom_level )
-        self._apply_full_image()
+        self._schedule_apply_full_image()
 
     @graceful_handler
     def mouseReleaseEvent( self, event : PySide6.QtGui.QMouseEvent ) -> None:
         if event.button() != PySide6.QtCore.Qt.MouseButton.LeftButton:
             return
 
-
         self._drag_pivot_image_offset = None
-        if self._drag_timer is not None:
-            self._drag_timer.stop()
-            self._drag_timer = None
 
     def pixmap(self) -> PySide6.QtGui.QPixmap:
+        self._flush_pending_apply()
         return self._fitting_image.pixmap()
     
     def setPixmap( self, pixmap : PySide6.QtGui.QPixmap, is_initial : bool = False ):
         if not is_initial:
             self._last_frame_time_monotonic = time.monotonic()
         self._full_image = pixmap
-        self._apply_full_image()
+        if is_initial:
+            self._apply_full_image() # the fitting image needs a pixmap right away
+        else:
+            self._schedule_apply_full_image()
         self.update_connection_status()
 
     def _get_magnification(self, zoom_level_difference) -> float:
         ''' Get magnification based on zoom level difference which may be negative.'''
+        if -self._MAGNIFICATION_TABLE_LIMIT <= zoom_level_difference <= self._MAGNIFICATION_TABLE_LIMIT:
+            return self._MAGNIFICATIONS[zoom_level_difference + self._MAGNIFICATION_TABLE_LIMIT]
         return pow( 1.2, zoom_level_difference )
     
     def _magnify(self, value : float | PySide6.QtCore.QPointF, zoom_level_difference ) -> float | PySide6.QtCore.QPointF:
@@ -212,6 +231,14 @@ class LiveView(PySide6.QtWidgets.QWidget):
         return value*magnification
     
     def _get_tranformation_matrix(self) -> PySide6.QtGui.QTransform:
+        # frames keep the same size and the view rarely moves, so the matrix can usually be reused
+        key = ( self._zoom_level, self._focus_image_offset.x(), self._focus_image_offset.y(), self._full_image.width(), self._full_image.height() )
+        if key != self._matrix_cache_key:
+            self._matrix_cache = self._make_tranformation_matrix()
+            self._matrix_cache_key = key
+        return self._matrix_cache
+
+    def _make_tranformation_matrix(self) -> PySide6.QtGui.QTransform:
         t = PySide6.QtGui.QTransform
         size = PySide6.QtCore.QPoint( self._full_image.width(), self._full_image.height() )
         magnification = self._get_magnification( self._zoom_level )
@@ -230,12 +257,33 @@ class LiveView(PySide6.QtWidgets.QWidget):
 
         return matrix
 
+    def _schedule_apply_full_image(self) -> None:
+        if not self._is_apply_pending:
+            self._is_apply_pending = True
+            PySide6.QtCore.QTimer.singleShot( 0, self, self._on_apply_timeout )
+
+    @graceful_handler
+    def _on_apply_timeout(self) -> None:
+        self._flush_pending_apply()
+
+    def _flush_pending_apply(self) -> None:
+        if self._is_apply_pending:
+            self._apply_full_image()
+
     def _apply_full_image(self) -> None:
+        self._is_apply_pending = False
+        if self._zoom_level == 0 and not self._full_image.hasAlphaChannel():
+            # the offset is clamped to the center at zoom 0, the composed image would be a plain copy
+            self._fitting_image.setPixmap( self._full_image )
+            return
         zoomed_image = PySide6.QtGui.QPixmap( self._full_image.size() )
-        zoomed_image.fill( PySide6.QtGui.QColorConstants.Gray )
+        if self._full_image.hasAlphaChannel():
+            zoomed_image.fill( PySide6.QtGui.QColorConstants.Gray ) # otherwise the clamped view covers the whole canvas
+        # scale just the part of the image that ends up on the canvas rather than transforming all of it
+        canvas_rect = PySide6.QtCore.QRectF( zoomed_image.rect() )
+        source_rect = self._get_tranformation_matrix().inverted()[0].mapRect( canvas_rect )
         with PySide6.QtGui.QPainter( zoomed_image ) as painter:
-            painter.setTransform( self._get_tranformation_matrix() )
-            painter.drawPixmap( PySide6.QtCore.QPoint(), self._full_image )
+            painter.drawPixmap( canvas_rect, self._full_image, source_rect )
         self._fitting_image.setPixmap( zoomed_image )
 
     def set_volume( self, volume : int ) -> None:
@@ -250,12 +298,13 @@ class LiveView(PySide6.QtWidgets.QWidget):
         self._volume_slider.setValue( volume )
     
     def heightMatchingAspect( self ) -> int:
+        self._flush_pending_apply()
         return self._fitting_image.heightMatchingAspect()
     
     def update_connection_status( self ) -> None:
-        delay_seconds = self._configuration.get_disconnect_indicator_delay().total_seconds()
-        period_seconds = 2.0
-        hidden_ratio_seconds = 0.4 # ratio of period during which the indicator overlay should be hidden so the user can actually see the last frame unobstructed
+        delay_seconds = self._disconnect_delay_seconds
+        period_seconds = self._BLINK_PERIOD_SECONDS
+        hidden_ratio_seconds = self._BLINK_HIDDEN_RATIO
 
         if self._last_frame_time_monotonic is None :
             self._set_overlay_opacity( 0 )
@@ -276,18 +325,30 @@ class LiveView(PySide6.QtWidgets.QWidget):
         self._set_overlay_opacity( (cycle - hidden_ratio_seconds) * 1/(1-hidden_ratio_seconds) )
 
     def _set_overlay_opacity( self, opacity : float ) -> None:
-        if opacity == 0:
+        opacity_step = round( opacity * self._OVERLAY_OPACITY_STEPS )
+        if opacity_step == self._overlay_opacity_step:
+            return # most ticks land on the same step, usually 0
+        self._overlay_opacity_step = opacity_step
+        if opacity_step == 0:
             self._disconnection_indicator.hide()
         else:
             self._disconnection_indicator.show()
-            transparenced_image = PySide6.QtGui.QPixmap( self._disconnection_image.size() )
-            transparenced_image.fill( PySide6.QtCore.Qt.GlobalColor.transparent )
+            self._disconnection_indicator.setPixmap( self._get_overlay_image( opacity_step ) )
+
+    def _get_overlay_image( self, opacity_step : int ) -> PySide6.QtGui.QPixmap:
+        transparenced_image = self._overlay_cache.get( opacity_step )
+        if transparenced_image is None:
+            # compose on a raster image in the format the label blends fastest, converted to a pixmap once
+            image = PySide6.QtGui.QImage( self._disconnection_image.size(), PySide6.QtGui.QImage.Format.Format_ARGB32_Premultiplied )
+            image.fill( PySide6.QtCore.Qt.GlobalColor.transparent )
             painter = PySide6.QtGui.QPainter()
-            painter.begin(transparenced_image)
-            painter.setOpacity( opacity )
+            painter.begin(image)
+            painter.setOpacity( opacity_step / self._OVERLAY_OPACITY_STEPS )
             painter.drawPixmap(0, 0, self._disconnection_image)
             painter.end()
-            self._disconnection_indicator.setPixmap( transparenced_image )
+            transparenced_image = PySide6.QtGui.QPixmap.fromImage( image, PySide6.QtCore.Qt.ImageConversionFlag.NoFormatConversion )
+            self._overlay_cache[opacity_step] = transparenced_image
+        return transparenced_image
 
     @graceful_handler
     def wheelEvent( self, event : PySide6.QtGui.QWheelEvent ) -> None:
@@ -314,20 +375,20 @@ class LiveView(PySide6.QtWidgets.QWidget):
             self._focus_image_offset = cursor_image_offset - self._magnify( cursor_view_offset, -self._zoom_level )
             self._focus_image_offset = self._clamp_focus_image_offest( self._focus_image_offset, self._zoom_level )
         
-        self._apply_full_image()
+        self._schedule_apply_full_image()
 
     @graceful_handler
     def _nudge( self, vector : PySide6.QtCore.QPointF ) -> None:
         vector = self._magnify( vector, -self._zoom_level )
         self._focus_image_offset += vector
         self._focus_image_offset = self._clamp_focus_image_offest( self._focus_image_offset, self._zoom_level )
-        self._apply_full_image()
+        self._schedule_apply_full_image()
     
     @graceful_handler
     def _zoom( self, delta ) -> None:
         self._zoom_level = max( 0, self._zoom_level + delta  )
         self._focus_image_offset = self._clamp_focus_image_offest( self._focus_image_offset, self._zoom_level )
-        self._apply_full_image()
+        self._schedule_apply_full_image()
 
     def _widget_pos_to_view_offset( self, widget_position : PySide6.QtCore.QPointF ) -> PySide6.QtCore.QPointF:
         return PySide6.QtCore.QPointF( (widget_position.x() / self.size().width() ) - 0.5,
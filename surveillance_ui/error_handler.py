@@ -1,9 +1,11 @@
+import atexit
 import typing
 import sys
 import dataclasses
 import datetime
 import traceback
 import threading
+import time
 import PySide6.QtWidgets
 import PySide6.QtGui
 import PySide6.QtCore
@@ -13,23 +15,45 @@ class _UncaughtExceptionInfo:
     exception : BaseException
     context : str
 
+class _ThreadState(threading.local):
+    exception_handler_count : int
+
+    def __init__(self):
+        # runs once in each thread that touches the state, no fallback lookups per handled event
+        self.exception_handler_count = 0
+
 class _ErrorHandlerSignals(PySide6.QtCore.QObject):
     uncaught_exception = PySide6.QtCore.Signal( _UncaughtExceptionInfo )
 
 class ErrorHandler:
+    _LOG_FILE_PATH = "errors.txt"
+    _DIALOG_INTERVAL_SECONDS = 30.0 # errors within this interval after a dialog are only logged
+    _REPORT_DELAY_MILLISECONDS = 50 # a cascade of failures within this window is logged with one write
+
+    # one append handle for the whole process, also used by the static hooks before any instance exists
+    _log_lock : threading.Lock = threading.Lock()
+    _log_file : typing.TextIO | None = None
+
+    # a failing per-frame handler raises the same fault over and over, its formatted traceback is reused
+    _FORMATTED_EXCEPTION_CACHE_SIZE = 64
+    _formatted_exception_cache : dict[tuple,list[str]] = dict() # guarded by _log_lock
 
     _application : PySide6.QtWidgets.QApplication
-    _last_exception_datetime : datetime
+    _last_dialog_time_monotonic : float | None
     _signals : _ErrorHandlerSignals
-    _local : threading.local
+    _local : _ThreadState
+    _pending_exception_infos : list[_UncaughtExceptionInfo] # only touched on the GUI thread
 
     def __init__(self, application : PySide6.QtWidgets.QApplication ):
-        self._last_exception_datetime = datetime.datetime.min
+        self._last_dialog_time_monotonic = None
         self._application = application
-        self._local = threading.local()
+        self._local = _ThreadState()
+        self._pending_exception_infos = []
+        atexit.register( self._log_pending_exceptions )
 
         self._signals = _ErrorHandlerSignals()
-        self._signals.uncaught_exception.connect( self._on_uncaught_exception )
+        # queued even from the GUI thread, the failing handler returns before anything is reported
+        self._signals.uncaught_exception.connect( self._on_uncaught_exception, PySide6.QtCore.Qt.ConnectionType.QueuedConnection )
         sys.excepthook = self.excepthook
 
     def handle_gracefully_internal( self, handler : typing.Callable, *args, **kwargs ):
@@ -58,18 +82,19 @@ class ErrorHandler:
             context - error context if one occurs, e.g. "File update detection has crashed."
             args, kwargs - event arguments to be passed to handler
         '''
+        local = self._local
         try:
-            self._local.exception_handler_count = 1 + getattr( self._local, "exception_handler_count", 0 )
+            local.exception_handler_count += 1
             handler( *args, **kwargs )
         except RecursionError as e:
-            if self._local.exception_handler_count > 1:
+            if local.exception_handler_count > 1:
                 raise # kick this up so that we don't run out of stack again while reporting it
             else:
                 self._signals.uncaught_exception.emit( _UncaughtExceptionInfo(e,  context) )
         except BaseException as e: # NOSONAR
             self._signals.uncaught_exception.emit( _UncaughtExceptionInfo(e,  context) )
         finally:
-            self._local.exception_handler_count -= 1
+            local.exception_handler_count -= 1
     
     def report_and_log_error( self, exception : BaseException, context : str ):
         self._signals.uncaught_exception.emit( _UncaughtExceptionInfo(exception,  context) )
@@ -82,18 +107,68 @@ class ErrorHandler:
 
     @staticmethod
     def log_error( exception : BaseException, context : str ):
-        with open("errors.txt", "a", encoding="utf-8") as file:
-            file.write( f"{datetime.datetime.now()}\n\n{ErrorHandler._format_error_info(exception, context)}\n---\n\n" )
+        ErrorHandler._write_log( ErrorHandler._format_log_record( exception, context ) )
+
+    @staticmethod
+    def _format_log_record( exception : BaseException, context : str ) -> str:
+        return f"{datetime.datetime.now()}\n\n{ErrorHandler._format_error_info(exception, context)}\n---\n\n"
+
+    @staticmethod
+    def _write_log( record : str ) -> None:
+        with ErrorHandler._log_lock:
+            if ErrorHandler._log_file is None:
+                ErrorHandler._log_file = open( ErrorHandler._LOG_FILE_PATH, "a", encoding="utf-8" )
+                atexit.register( ErrorHandler._log_file.close )
+            ErrorHandler._log_file.write( record )
+            ErrorHandler._log_file.flush() # the process may be about to die, the record must reach the disk
 
     @staticmethod
     def _format_error_info( exception : BaseException, context : str, limit : int | None = None ) -> str:
-        return f"{context}\n\n{'\n'.join(traceback.format_exception(exception, limit = limit ))}"
+        return f"{context}\n\n{'\n'.join(ErrorHandler._format_exception(exception, limit = limit ))}"
+
+    @staticmethod
+    def _format_exception( exception : BaseException, limit : int | None ) -> list[str]:
+        if exception.__cause__ is not None or exception.__context__ is not None:
+            return traceback.format_exception(exception, limit = limit ) # chains are rare, not worth a key
+
+        # walking the frames is cheap, it's looking up and formatting the source lines that costs
+        key = (
+            type(exception),
+            str(exception),
+            limit,
+            tuple( (frame.f_code, line_number) for frame, line_number in traceback.walk_tb( exception.__traceback__ ) )
+        )
+        with ErrorHandler._log_lock:
+            formatted_exception = ErrorHandler._formatted_exception_cache.get( key )
+        if formatted_exception is None:
+            formatted_exception = traceback.format_exception(exception, limit = limit )
+            with ErrorHandler._log_lock:
+                if len(ErrorHandler._formatted_exception_cache) >= ErrorHandler._FORMATTED_EXCEPTION_CACHE_SIZE:
+                    ErrorHandler._formatted_exception_cache.clear()
+                ErrorHandler._formatted_exception_cache[key] = formatted_exception
+        return formatted_exception
     
     def _on_uncaught_exception( self, uncaught_exception_info : _UncaughtExceptionInfo ) -> None:
-        ErrorHandler.log_error( uncaught_exception_info.exception, uncaught_exception_info.context )
+        self._pending_exception_infos.append( uncaught_exception_info )
+        if len(self._pending_exception_infos) == 1:
+            PySide6.QtCore.QTimer.singleShot( self._REPORT_DELAY_MILLISECONDS, self._report_pending_exceptions )
+
+    def _log_pending_exceptions( self ) -> list[_UncaughtExceptionInfo]:
+        exception_infos = self._pending_exception_infos
+        self._pending_exception_infos = []
+        if len(exception_infos) > 0:
+            ErrorHandler._write_log( "".join( [ErrorHandler._format_log_record( info.exception, info.context ) for info in exception_infos] ) )
+        return exception_infos
+
+    def _report_pending_exceptions( self ) -> None:
+        exception_infos = self._log_pending_exceptions()
+        if len(exception_infos) == 0:
+            return
+        uncaught_exception_info = exception_infos[0] # the first of a cascade is the likely cause
 
-        if (datetime.datetime.now() - self._last_exception_datetime) > datetime.timedelta(seconds=30):
-            self._last_exception_datetime = datetime.datetime.now()
+        now_monotonic = time.monotonic()
+        if self._last_dialog_time_monotonic is None or now_monotonic - self._last_dialog_time_monotonic > self._DIALOG_INTERVAL_SECONDS:
+            self._last_dialog_time_monotonic = now_monotonic
             dialog = PySide6.QtWidgets.QMessageBox(self._application)
             dialog.setWindowTitle("Error")
             dialog.setIcon( PySide6.QtWidgets.QMessageBox.Icon.Critical )
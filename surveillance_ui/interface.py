@@ -1,6 +1,7 @@
 import typing
 import dataclasses
 import datetime
+import functools
 import gettext
 import pathlib
 import PySide6.QtCore
@@ -9,7 +10,7 @@ if typing.TYPE_CHECKING:
     import numpy
     import supervision
 
-@dataclasses.dataclass
+@dataclasses.dataclass( frozen=True, slots=True )
 class CamDefinition:
     url : str
     id : int
@@ -17,7 +18,7 @@ class CamDefinition:
     sound_alert_path : str
     discard_corrupted_frames : bool = False
 
-@dataclasses.dataclass
+@dataclasses.dataclass( frozen=True, slots=True )
 class Interest:
     coco_class_id : int
     label : str
@@ -45,6 +46,24 @@ class DetectionLogic(typing.Protocol):
         Returns detections.
         """
 
+    def detect_batch( self, images : list['numpy.ndarray'] ) -> list['supervision.Detections']:
+        """
+        Detect objects in the latest frames of several cams at once.
+
+        Optional, implement it when processing a batch is faster than processing the images one by one.
+        The results shall conform to settings provided by configure().
+
+        Parameters:
+           images - Images in QImage.Format.Format_RGB888, do not modify
+        Returns detections for each image in the same order.
+        """
+        return [self.detect( image ) for image in images]
+
+@functools.cache
+def _load_translation( language : str ) -> gettext.NullTranslations:
+    # shared by all configurations with the same language
+    return gettext.translation( domain="AISurveillant", localedir="locales", languages=[language] )
+
 @dataclasses.dataclass
 class Configuration:
     """
@@ -72,23 +91,38 @@ class Configuration:
     language : str = "en"
 
     def get_cam_definition( self, cam_id : int ) -> CamDefinition:
-        for cam_definition in self.cam_definitions:
-            if cam_definition.id == cam_id:
-                return cam_definition
-        raise ValueError("Unknown cam ID.")
+        try:
+            return self._get_cam_definitions_by_id()[cam_id]
+        except KeyError:
+            raise ValueError("Unknown cam ID.")
 
     def is_defined_cam( self, cam_id : int ) -> bool:
-        return any( [cd.id == cam_id for cd in self.cam_definitions] )
+        return cam_id in self._get_cam_definitions_by_id()
     
     def get_interest( self, coco_class_id : int ) -> Interest:
-        for interest in self.interests:
-            if interest.coco_class_id == coco_class_id:
-                return interest
-        raise ValueError("Unknown coco class ID.")
+        try:
+            return self._get_interests_by_coco_class_id()[coco_class_id]
+        except KeyError:
+            raise ValueError("Unknown coco class ID.")
     
     def is_defined_interest( self, interest_id : int ) -> bool:
-        return any( [interest.coco_class_id == interest_id for interest in self.interests] )
+        return interest_id in self._get_interests_by_coco_class_id()
     
+    def _get_cam_definitions_by_id( self ) -> dict[int,CamDefinition]:
+        # built on first use like the translation, the definitions do not change once the UI runs
+        if not hasattr(self, "cam_definitions_by_id"):
+            self.cam_definitions_by_id = dict()
+            for cam_definition in self.cam_definitions:
+                self.cam_definitions_by_id.setdefault( cam_definition.id, cam_definition ) # the first definition wins as in a linear search
+        return self.cam_definitions_by_id
+
+    def _get_interests_by_coco_class_id( self ) -> dict[int,Interest]:
+        if not hasattr(self, "interests_by_coco_class_id"):
+            self.interests_by_coco_class_id = dict()
+            for interest in self.interests:
+                self.interests_by_coco_class_id.setdefault( interest.coco_class_id, interest )
+        return self.interests_by_coco_class_id
+
     def get_disconnect_indicator_delay(self) -> datetime.timedelta:
         '''
         Get disconnect indicator delay.
@@ -100,6 +134,6 @@ class Configuration:
     
     def get_text( self, message : str ) -> str:
         if not hasattr(self, "translation"):
-            self.translation = gettext.translation( domain="AISurveillant", localedir="locales", languages=[self.language] )
+            self.translation = _load_translation( self.language )
 
         return self.translation.gettext( message )
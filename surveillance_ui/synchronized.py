@@ -4,31 +4,26 @@ import typing
 _T = typing.TypeVar('T')
 
 class Synchronized(typing.Generic[_T]):
+    __slots__ = ( "_value", "_lock" )
 
     _value : _T
-    _lock : threading.RLock
+    _lock : threading.Lock # not reentrant, do not call lock() again while holding it
 
     def __init__(self, value : _T):
         self._value = value
-        self._lock = threading.RLock()
-    
-    def lock(self) -> "LockContext[_T]":
-        return LockContext(self)
-    
+        self._lock = threading.Lock()
+
+    def lock(self) -> "Synchronized[_T]":
+        # the instance is its own context manager, no object is allocated per lock
+        return self
+
     def set(self, value : _T) -> None:
         with self.lock():
             self._value = value
 
-class LockContext(typing.Generic[_T]):
-
-    _synchronized : Synchronized[_T]
-
-    def __init__(self, _synchronized : Synchronized[_T] ):
-        self._synchronized = _synchronized
-
-    def __enter__(self):
-        self._synchronized._lock.acquire()
-        return self._synchronized._value
+    def __enter__(self) -> _T:
+        self._lock.acquire()
+        return self._value
 
     def __exit__(self, type, value, traceback):
-        return self._synchronized._lock.release()
+        return self._lock.release()
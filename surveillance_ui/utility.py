@@ -1,7 +1,11 @@
 import PySide6.QtMultimedia
 import av.audio
+import av.frame
+import av.codec.context
 import av.video
+import av.video.reformatter
 import numpy
+import os
 import threading
 import queue
 import typing
@@ -11,6 +15,7 @@ import time
 import datetime
 import functools
 import av.container.input
+import collections
 import PySide6.QtWidgets
 import PySide6.QtGui
 import PySide6.QtCore
@@ -18,14 +23,27 @@ from .error_handler import (
     ErrorHandler as _ErrorHandler
 )
 
+def _av_flag( flags : type, name : str ) -> typing.Any:
+    # PyAV 14 renamed the codec flags to lowercase, requirements.txt still allows 13
+    flag = getattr( flags, name, None )
+    return flag if flag is not None else getattr( flags, name.upper() )
+
 class LastFrameVideoCapture:
+    _MAX_DECODING_THREAD_COUNT = 8 # per camera, streams rarely have more slices and several cameras share the cores
+    _AUDIO_BYTES_PER_SAMPLE = 2 # mono s16p as set up in the resampler
+
     _input_container_constructor : typing.Callable[[],av.container.input.InputContainer]
     _thread : threading.Thread
-    _frame_queue : queue.Queue[numpy.ndarray]
+    _converting_thread : threading.Thread
+    _video_frame_queue : queue.Queue[av.video.frame.VideoFrame | None] # None tells the converting thread to stop
+    _latest_frame : collections.deque[numpy.ndarray] # maxlen 1, appending drops the frame nobody has read
+    _latest_frame_event : threading.Event # set when a frame is appended
     _on_frame : typing.Callable[[numpy.ndarray],None]
     _on_audio_bytes : typing.Callable[[bytes],None]
     _shutdown_pending : bool = False
     _resampler : av.AudioResampler
+    _reformatter : av.video.reformatter.VideoReformatter # only used by the converting thread, keeps its scaler context between frames
+    _frame_processors : dict[type,typing.Callable[[av.frame.Frame],None]] # keyed by the exact frame class
 
     def __init__(
             self,
@@ -43,22 +61,41 @@ class LastFrameVideoCapture:
         self._on_frame = on_frame
         self._on_audio_bytes = on_audio_bytes
         self._on_uncaught_exception = on_uncaught_exception
-        self._frame_queue = queue.Queue(1)
+        self._latest_frame = collections.deque( maxlen=1 )
+        self._latest_frame_event = threading.Event()
+        self._video_frame_queue = queue.Queue( 2 )
         
         self._resampler = av.AudioResampler(
             format=av.AudioFormat("s16p"),
             layout='mono',
             rate=48000,
         )
+        self._reformatter = av.video.reformatter.VideoReformatter()
+        self._frame_processors = {
+            av.video.frame.VideoFrame: self._queue_video_frame,
+            av.audio.frame.AudioFrame: self._process_audio_frame,
+        }
 
         def graceful_frame_pulling_process():
             try:
                 self._frame_pulling_process()
             except BaseException as e: # NOSONAR
                 on_uncaught_exception(e)
+            finally:
+                self._queue_video_frame( None )
+        
+        def graceful_frame_converting_process():
+            try:
+                self._frame_converting_process()
+            except BaseException as e: # NOSONAR
+                on_uncaught_exception(e)
         
+        # decoding and the rgb24 conversion run on separate threads so that one frame converts while the next decodes
         self._thread = threading.Thread( target=graceful_frame_pulling_process )
         self._thread.daemon = True
+        self._converting_thread = threading.Thread( target=graceful_frame_converting_process )
+        self._converting_thread.daemon = True
+        self._converting_thread.start()
         self._thread.start()
     
     def _frame_pulling_process(self):
@@ -67,34 +104,75 @@ class LastFrameVideoCapture:
             try:
                 if self._shutdown_pending:
                     return                
-                input_container = self._input_container_constructor()
-                audio_channel_count = len( input_container.streams.audio )
-                
-                if audio_channel_count > 0:
-                    frame_iterator = input_container.decode( audio=0, video=0 )
-                else:
-                    frame_iterator = input_container.decode( video=0 )
-                
-                for frame in frame_iterator:
-                    if self._shutdown_pending:
-                        return
-                    self._process_frame(frame)
+                # closed on every exit path, a reconnect must not leave the previous connection open until it is collected
+                with self._input_container_constructor() as input_container:
+                    self._configure_decoding( input_container )
+                    audio_channel_count = len( input_container.streams.audio )
+                    
+                    if audio_channel_count > 0 and self._on_audio_bytes is not None:
+                        frame_iterator = input_container.decode( audio=0, video=0 )
+                    else:
+                        frame_iterator = input_container.decode( video=0 )
+                    
+                    frame_processors = self._frame_processors
+                    for frame in frame_iterator:
+                        if self._shutdown_pending:
+                            return
+                        frame_processors[type( frame )]( frame )
+                        del frame # release the decoded buffer while blocked on the next read, not after it
             except av.FFmpegError as e:
                 print( f"Video capture exception: {e}", file=sys.stderr )
                 time.sleep(0.5) # Limit the retry speed so that a misconfigured cam doesn't eat too many resources.
     
-    def _process_frame( self, frame : av.video.frame.VideoFrame | av.audio.frame.AudioFrame ) -> None:
-        if isinstance( frame, av.video.frame.VideoFrame ):
-            image = frame.to_ndarray(format="rgb24")
-            
-            if self._on_frame is not None:
-                self._on_frame(image)
+    def _configure_decoding( self, input_container : av.container.input.InputContainer ) -> None:
+        for video_stream in input_container.streams.video:
+            # FRAME threading would hold back one frame per thread, SLICE keeps the latest frame current
+            video_stream.thread_type = "SLICE"
+            video_stream.thread_count = min( self._MAX_DECODING_THREAD_COUNT, os.cpu_count() or 1 )
+            # emit decoded frames right away instead of filling the reorder buffer first
+            video_stream.codec_context.flags |= _av_flag( av.codec.context.Flags, "low_delay" )
+            if video_stream.codec_context.name == "h264":
+                video_stream.codec_context.flags2 |= _av_flag( av.codec.context.Flags2, "fast" )
+
+    def _queue_video_frame( self, frame : av.video.frame.VideoFrame | None ) -> None:
+        try:
+            self._video_frame_queue.put_nowait( frame )
+        except queue.Full:
+            # the conversion fell behind, drop the oldest frame rather than stall decoding
+            try:
+                self._video_frame_queue.get_nowait()
+            except queue.Empty:
+                pass
+            self._video_frame_queue.put_nowait( frame ) # this thread is the only producer, there is room now
 
-            self._update_latest_frame(image)
-        else:
-            if self._on_audio_bytes is not None:
-                for audio_frame in self._resampler.resample( frame ):
-                    self._on_audio_bytes( audio_frame.to_ndarray().tobytes() )
+    def _frame_converting_process(self):
+        while True:
+            frame = self._video_frame_queue.get()
+            if frame is None:
+                return
+            self._process_video_frame( frame )
+            del frame # see _frame_pulling_process
+
+    def _process_video_frame( self, frame : av.video.frame.VideoFrame ) -> None:
+        # newer PyAV hands out a row-strided view when the rgb24 lines are padded, but QImage needs packed rows;
+        # only such odd widths get copied, aligned ones stay a view of the frame
+        image = numpy.ascontiguousarray( self._reformatter.reformat( frame, format="rgb24" ).to_ndarray() )
+        
+        if self._on_frame is not None:
+            self._on_frame(image)
+
+        self._update_latest_frame(image)
+
+    def _process_audio_frame( self, frame : av.audio.frame.AudioFrame ) -> None:
+        # audio is only decoded when there is a callback for it
+        # one callback per source frame, the resampler may split it into several fragments
+        # the plane buffer is padded past the last sample, hence the slice
+        audio_views = [
+            memoryview( audio_frame.planes[0] )[:audio_frame.samples * self._AUDIO_BYTES_PER_SAMPLE]
+            for audio_frame in self._resampler.resample( frame )
+        ]
+        if len( audio_views ) > 0:
+            self._on_audio_bytes( b"".join( audio_views ) )
     
     def get_latest_frame(self, timeout=float) -> numpy.ndarray:
         """
@@ -104,31 +182,37 @@ class LastFrameVideoCapture:
 
         Returns: frame as 24bit RGB ndarray
         """
+        if not self._latest_frame_event.wait(timeout=timeout):
+            return None
+        self._latest_frame_event.clear()
         try:
-            return self._frame_queue.get(timeout=timeout)
-        except queue.Empty:
+            return self._latest_frame.popleft()
+        except IndexError: # the previous call already took the frame that set the event again
             return None
     
     def shut_down(self) -> None:
         self._shutdown_pending = True
         self._thread.join()
+        self._converting_thread.join()
     
     def _update_latest_frame(self, frame : numpy.ndarray ):
-        try:
-            self._frame_queue.get_nowait()
-        except queue.Empty as _:
-            pass
-
-        self._frame_queue.put(frame)
+        self._latest_frame.append(frame)
+        self._latest_frame_event.set()
 
 class FittingImage(PySide6.QtWidgets.QLabel):
     
     _error_handler : _ErrorHandler
+    _pixmap_width : int # cached by setPixmap, 0 while there is no pixmap
+    _pixmap_height : int
+    _half_margins : tuple[int,int] # horizontal, vertical, as last set by _setSymetricMargins
     marginsChanged = PySide6.QtCore.Signal( PySide6.QtCore.QMargins )
 
     def __init__(self, min_size_x : int, min_size_y : int, error_handler : _ErrorHandler ):
         super().__init__()
         self._error_handler = error_handler
+        self._pixmap_width = 0
+        self._pixmap_height = 0
+        self._half_margins = ( 0, 0 )
         self.setScaledContents(True)
         self.setMinimumSize(min_size_x,min_size_y)
 
@@ -140,6 +224,8 @@ class FittingImage(PySide6.QtWidgets.QLabel):
 
     def setPixmap( self, pixmap : PySide6.QtGui.QPixmap ) -> None:
         super().setPixmap(pixmap)
+        self._pixmap_width = pixmap.width()
+        self._pixmap_height = pixmap.height()
         self._updateMargins()
     
     @graceful_handler
@@ -151,55 +237,49 @@ class FittingImage(PySide6.QtWidgets.QLabel):
         if not self._are_size_data_available():
              return self.minimumSize().height()
 
-        pixmap_aspect_ratio = self.pixmap().size().width() / self.pixmap().size().height()
-        width = self.size().width()
-
-        return int(width / pixmap_aspect_ratio)
+        return self.width() * self._pixmap_height // self._pixmap_width
 
     def _are_size_data_available(self) -> bool:
-        return (
-            self.pixmap() is not None
-            and
-            all( [size.height() > 0 or size.width() > 0 for size in [self.pixmap().size(), self.size()]])
-        )
+        return self._pixmap_width > 0 and self._pixmap_height > 0 and ( self.width() > 0 or self.height() > 0 )
 
     def _updateMargins( self ):
         if not self._are_size_data_available():
             self._setSymetricMargins( 0, 0 )
             return
         
-        pixmap_aspect_ratio = self.pixmap().size().width() / self.pixmap().size().height()
-        widget_aspect_ratio = self.width() / self.height() 
+        pixmap_width, pixmap_height = self._pixmap_width, self._pixmap_height
+        width, height = self.width(), self.height()
 
-        def calculate_margin_ratio( widget_dimension : float, pixmap_dimension : float ) -> float:
-            return max( widget_dimension - pixmap_dimension, 0 ) / (widget_dimension)
-        
-        horizontal_margin_ratio = calculate_margin_ratio( widget_aspect_ratio, pixmap_aspect_ratio )
-        vertical_margin_ratio = calculate_margin_ratio( 1/widget_aspect_ratio, 1/pixmap_aspect_ratio )      
-        
-        horizontal_half_margin = horizontal_margin_ratio * self.width() * 0.5
-        vertical_half_margin = vertical_margin_ratio * self.height() * 0.5
-
-        self._setSymetricMargins( horizontal_half_margin, vertical_half_margin )
+        # compare the aspect ratios cross-multiplied, the margins go on the side where the pixmap is relatively shorter
+        if pixmap_width * height > pixmap_height * width:
+            self._setSymetricMargins( 0, ( height - width * pixmap_height // pixmap_width ) // 2 )
+        else:
+            self._setSymetricMargins( ( width - height * pixmap_width // pixmap_height ) // 2, 0 )
     
     def _setSymetricMargins( self, horizontal_half_margins : int, vertical_half_margins : int ) -> None:
+        if self._half_margins == ( horizontal_half_margins, vertical_half_margins ):
+            return
+        self._half_margins = ( horizontal_half_margins, vertical_half_margins )
         new_margins = PySide6.QtCore.QMargins( horizontal_half_margins, vertical_half_margins, horizontal_half_margins, vertical_half_margins )
-        if self.contentsMargins() != new_margins:
-            self.setContentsMargins( new_margins )
-            self.marginsChanged.emit( new_margins )
+        self.setContentsMargins( new_margins )
+        self.marginsChanged.emit( new_margins )
 
 _T = typing.TypeVar('T')
 
 class EventDispatcher(typing.Generic[_T]):
 
-    _listeners : list[typing.Callable[[_T],None]]
+    _listeners : tuple[typing.Callable[[_T],None], ...] # replaced rather than mutated, so fire() can iterate it while listeners change
+
+    def __init__( self ):
+        self._listeners = tuple()
 
     def register( self, listener : typing.Callable[[_T],None] ) -> None:
-        self._listeners = list()
-        self._listeners.append( listener )
+        self._listeners = self._listeners + ( listener, )
 
     def forget( self, listener : typing.Callable[[_T],None] ) -> None:
-        self._listeners.remove( listener )
+        listeners = list( self._listeners )
+        listeners.remove( listener )
+        self._listeners = tuple( listeners )
 
     def fire( self, event : _T ) -> None:
         for listener in self._listeners:
@@ -213,14 +293,20 @@ class _SoundChunk:
 class _VolumeUpdate:
     volume : float
 
+@dataclasses.dataclass
+class _Shutdown:
+    pass
+
 class _AudioStreamPlayerWorker(PySide6.QtCore.QRunnable):
+    _REJECTED_WRITE_REPORT_INTERVAL_SECONDS = 1.0 # a full sink rejects writes every back-off, report it once in a while
 
     _format : PySide6.QtMultimedia.QAudioFormat
-    _sound_data_queue : queue.Queue[_SoundChunk | _VolumeUpdate]
-    _shutdown_pending : bool = False
+    _sound_data_queue : collections.deque[_SoundChunk | _VolumeUpdate | _Shutdown] # only the worker pops, so it may peek
+    _sound_data_event : threading.Event # set after every append
     _error_handler : _ErrorHandler
     _target_delay_us : int
     _delay_tolerance_us : int
+    _last_rejected_write_report_time_monotonic : float | None
 
     def __init__( self,
                   format : PySide6.QtMultimedia.QAudioFormat,
@@ -230,8 +316,10 @@ class _AudioStreamPlayerWorker(PySide6.QtCore.QRunnable):
         self._format = format
         self._target_delay_us = int(target_delay.total_seconds() * pow(10,6))
         self._delay_tolerance_us = int(delay_tolerance.total_seconds() * pow(10,6))
-        self._sound_data_queue = queue.Queue()
+        self._sound_data_queue = collections.deque()
+        self._sound_data_event = threading.Event()
         self._error_handler = error_handler
+        self._last_rejected_write_report_time_monotonic = None
         super().__init__()
     
     def graceful_handler( handler ):
@@ -246,34 +334,66 @@ class _AudioStreamPlayerWorker(PySide6.QtCore.QRunnable):
         output_sink.setVolume(0.0)
         output_sink.setBufferSize( self._format.bytesForDuration( self._target_delay_us + 3*self._delay_tolerance_us ) )
         output_device = output_sink.start()
+        # the format and the buffer size are fixed from here on, compare in bytes rather than converting every chunk to time
+        buffer_size = output_sink.bufferSize()
+        max_bytes_buffered = self._format.bytesForDuration( self._target_delay_us + self._delay_tolerance_us )
+        min_bytes_buffered = self._format.bytesForDuration( self._target_delay_us - self._delay_tolerance_us )
+        get_bytes_free = output_sink.bytesFree
+        take_audio_data = self._take_audio_data
         
         while True:
-
-            if self._shutdown_pending:
-                return
+            audio_data = take_audio_data()
             
-            try:
-                audio_data = self._sound_data_queue.get( block=True, timeout=0.1 )
-            except queue.Empty:
-                continue
-            
-            if isinstance( audio_data, _VolumeUpdate ):
-                output_sink.setVolume(audio_data.volume)
+            if isinstance( audio_data, _Shutdown ):
+                return
+            elif isinstance( audio_data, _VolumeUpdate ):
+                output_sink.setVolume( self._take_latest_volume( audio_data ) )
             else:
                 assert isinstance( audio_data, _SoundChunk )
-                bytes_buffered = output_sink.bufferSize() - output_sink.bytesFree()
-                usecs_buffered = self._format.durationForBytes( bytes_buffered )
-                # technically, we have a whole new packet to add, and that would give us different usecs_buffered but
+                bytes_buffered = buffer_size - get_bytes_free()
+                # technically, we have a whole new packet to add, and that would give us different bytes_buffered but
                 # it would complicate the math a lot to think about it
 
-                if usecs_buffered > self._target_delay_us + self._delay_tolerance_us:
+                if bytes_buffered > max_bytes_buffered:
                     # skip for now, TODO speed up playback
                     pass
-                elif usecs_buffered < self._target_delay_us - self._delay_tolerance_us:
+                elif bytes_buffered < min_bytes_buffered:
                     # add for now, TODO slow down playback
-                    self._write_data( output_device, audio_data.data )
+                    self._write_data( output_device, self._take_sound_backlog( audio_data, max_bytes_buffered - bytes_buffered ) )
                 else:
-                    self._write_data( output_device, audio_data.data )
+                    self._write_data( output_device, self._take_sound_backlog( audio_data, max_bytes_buffered - bytes_buffered ) )
+
+    def _take_audio_data( self ) -> _SoundChunk | _VolumeUpdate | _Shutdown:
+        # blocks without polling, shutdown() wakes it up with a _Shutdown item
+        while len( self._sound_data_queue ) == 0:
+            self._sound_data_event.wait()
+            self._sound_data_event.clear() # cleared before the queue is checked again, so no append goes unnoticed
+        return self._sound_data_queue.popleft()
+
+    def _take_latest_volume( self, first_update : _VolumeUpdate ) -> float:
+        # a slider drag queues a burst of updates, only the last one needs to reach the sink
+        volume = first_update.volume
+        sound_data_queue = self._sound_data_queue
+        while len( sound_data_queue ) > 0 and isinstance( sound_data_queue[0], _VolumeUpdate ):
+            volume = sound_data_queue.popleft().volume
+        return volume
+
+    def _take_sound_backlog( self, first_chunk : _SoundChunk, max_byte_count : int ) -> bytes:
+        """
+        Join the chunks queued right behind first_chunk so that a backlog is written in one go
+
+        The backlog ends at the first item that is not a chunk or at the first chunk that would take it past
+        max_byte_count, that item stays queued and gets its own latency check.
+        """
+        chunks = [first_chunk.data]
+        byte_count = len( first_chunk.data )
+        sound_data_queue = self._sound_data_queue
+        while ( len( sound_data_queue ) > 0 and isinstance( sound_data_queue[0], _SoundChunk )
+                and byte_count + len( sound_data_queue[0].data ) <= max_byte_count ):
+            chunk_data = sound_data_queue.popleft().data
+            chunks.append( chunk_data )
+            byte_count += len( chunk_data )
+        return b"".join( chunks )
 
     def _write_data( self, device : PySide6.QtCore.QIODevice, data : bytes ) -> None:
         while data:
@@ -281,17 +401,28 @@ class _AudioStreamPlayerWorker(PySide6.QtCore.QRunnable):
             if written:
                 data = data[written:]
             else:
-                print( "did not accept data" )
+                self._report_rejected_write()
                 time.sleep(0.01)
 
+    def _report_rejected_write( self ) -> None:
+        now_monotonic = time.monotonic()
+        if ( self._last_rejected_write_report_time_monotonic is None
+             or now_monotonic - self._last_rejected_write_report_time_monotonic > self._REJECTED_WRITE_REPORT_INTERVAL_SECONDS ):
+            self._last_rejected_write_report_time_monotonic = now_monotonic
+            print( "Audio output did not accept data", file=sys.stderr )
+
     def push(self, chunk : bytes):
-        self._sound_data_queue.put( _SoundChunk(chunk) )
+        self._put( _SoundChunk(chunk) )
 
     def set_volume(self, volume : float):
-        self._sound_data_queue.put( _VolumeUpdate(volume) )
+        self._put( _VolumeUpdate(volume) )
 
     def shutdown(self):
-        self._shutdown_pending = True
+        self._put( _Shutdown() )
+
+    def _put( self, audio_data : _SoundChunk | _VolumeUpdate | _Shutdown ) -> None:
+        self._sound_data_queue.append( audio_data )
+        self._sound_data_event.set()
     
 class AudioStreamPlayer:
 
@@ -9,6 +9,7 @@ if typing.TYPE_CHECKING:
     import supervision
 
 # This code assumes YOLOv9 (https://github.com/WongKinYiu/yolov9) is cloned into the yolov9 subfolder.
+_YOLOV9_PATH = os.path.join( os.path.dirname( os.path.realpath(__file__) ), "yolov9" )
 
 class YoloV9Weights(enum.Enum):
     Tiny = 't'
@@ -20,65 +21,72 @@ class YoloV9Weights(enum.Enum):
 class YoloV9DetectionLogic(surveillance_ui.DetectionLogic):
     _model : object
     _weight : YoloV9Weights
+    _class_names : 'numpy.ndarray' # indexed by class id
 
     def __init__( self, weight : YoloV9Weights ):
         self._model = None
         self._weight = weight
 
     def _ensure_model_initialized(self) -> None:
+        if self._model is not None:
+            return # detect() calls this for every frame
+
+        import numpy
         import torch
         self._ensure_yolov9_is_on_path()
         from yolov9.models.common import DetectMultiBackend, AutoShape
 
-        if self._model is not None:
-            return
-
         device = torch.device('cuda:0' if torch.cuda.is_available() else 'cpu')
         self._model = AutoShape( DetectMultiBackend( weights=f"yolov9/weights/yolov9-{self._weight.value}-converted.pt", device=device, data='data/coco.yaml', fuse=True) )
         self._model.iou = 0.6 # intersection over union (when to merge overlapping detections into one)
         self._model.agnostic = False
         self._model.max_det = 1000
+        self._model.amp = True # AutoShape already runs in inference mode, this adds float16 autocast off the CPU
+        self._class_names = numpy.array([self._model.names[i] for i in range(len(self._model.names))])
         
     def configure( self, coco_class_ids : list[int], confidence : float ) -> None:
-        self._ensure_model_initialized()
-        self._ensure_yolov9_is_on_path()
+        self._ensure_model_initialized() # also puts yolov9 on the path
         from yolov9.models.common import AutoShape
         model = typing.cast( AutoShape, self._model)
         model.classes = coco_class_ids
         model.conf = confidence
 
     def detect( self, image : 'numpy.ndarray' ) -> 'supervision.Detections':
+        return self.detect_batch( [image] )[0]
+
+    def detect_batch( self, images : list['numpy.ndarray'] ) -> list['supervision.Detections']:
         self._ensure_model_initialized()
-        results = self._model(image, (image.shape[1], image.shape[0]), augment=False)
-        return self._yolov9_detections_to_sv(results)
+        # AutoShape letterboxes a batch to one common size, batching only same-sized images keeps each at its native size
+        indices_by_shape : dict[tuple[int,...],list[int]] = dict()
+        for i, image in enumerate( images ):
+            indices_by_shape.setdefault( image.shape, [] ).append( i )
+
+        detections = [None] * len( images )
+        for shape, indices in indices_by_shape.items():
+            results = self._model([images[i] for i in indices], (shape[1], shape[0]), augment=False)
+            for i, prediction in zip( indices, results.pred ):
+                detections[i] = self._yolov9_prediction_to_sv( prediction )
+        return detections
     
-    def _yolov9_detections_to_sv(self, yolov9_results) -> 'supervision.Detections':
-        import torch
+    def _yolov9_prediction_to_sv(self, prediction) -> 'supervision.Detections':
         import numpy
         import supervision
         import supervision.config
 
-        xyxy, confidences, class_ids = [], [], []
-
-        for det in yolov9_results.pred:
-            for *xyxy_coords, conf, cls_id in reversed(det):
-                xyxy.append(torch.stack(xyxy_coords).cpu().numpy())
-                confidences.append(float(conf))
-                class_ids.append(int(cls_id))
-
-        class_names = numpy.array([yolov9_results.names[i] for i in class_ids])
-        
-        if not xyxy:
-            return supervision.Detections.empty()  
+        if len( prediction ) == 0:
+            return supervision.Detections.empty()
         
+        # one device to host transfer per image rather than one per detection, rows reversed as before
+        prediction = prediction.detach().cpu().numpy()[::-1] # rows of x1, y1, x2, y2, confidence, class id
+        class_ids = prediction[:, 5].astype(int)
+
         return supervision.Detections(
-            xyxy=numpy.vstack(xyxy),
-            confidence=numpy.array(confidences),
-            class_id=numpy.array(class_ids),
-            data={supervision.config.CLASS_NAME_DATA_FIELD: class_names},
+            xyxy=numpy.ascontiguousarray(prediction[:, :4]),
+            confidence=prediction[:, 4].astype(float),
+            class_id=class_ids,
+            data={supervision.config.CLASS_NAME_DATA_FIELD: self._class_names[class_ids]},
         )
     
     def _ensure_yolov9_is_on_path(self):
-        yolov9_path = os.path.join( os.path.dirname( os.path.realpath(__file__) ), "yolov9" )
-        if yolov9_path not in sys.path:
-            sys.path.append(yolov9_path)
\ No newline at end of file
+        if _YOLOV9_PATH not in sys.path:
+            sys.path.append(_YOLOV9_PATH)
\ No newline at end of file